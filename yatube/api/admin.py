@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Token
+
+
+@admin.register(Token)
+class TokenAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'user', 'created')
+    search_fields = ('user__username',)
+    readonly_fields = ('digest',)
@@ -0,0 +1,50 @@
+import hashlib
+import secrets
+
+from django.contrib.auth import get_user_model
+from django.db import models
+
+User = get_user_model()
+
+
+class Token(models.Model):
+    """Ключ доступа к API для клиентов без сессии.
+
+    В базе хранится только хэш ключа: сам ключ показывается один раз,
+    при выдаче.
+    """
+    digest = models.CharField('Хэш ключа', max_length=64, unique=True)
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='api_token',
+        verbose_name='Пользователь'
+    )
+    created = models.DateTimeField('Выдан', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Токен API'
+        verbose_name_plural = 'Токены API'
+
+    def __str__(self) -> str:
+        return f'Токен {self.user}'
+
+    @staticmethod
+    def hash(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user):
+        """Выдаёт пользователю новый ключ взамен прежнего."""
+        key = secrets.token_hex(20)
+        cls.objects.update_or_create(
+            user=user, defaults={'digest': cls.hash(key)})
+        return key
+
+    @classmethod
+    def user_for(cls, key):
+        token = cls.objects.select_related('user').filter(
+            digest=cls.hash(key)).first()
+        if token is None or not token.user.is_active:
+            return None
+        return token.user
@@ -0,0 +1,253 @@
+import json
+from http import HTTPStatus
+
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+NUM_TEST_POSTS: int = 25
+TEST_USERNAME: str = 'auth'
+TEST2_USERNAME: str = 'test2'
+TOKEN_USERNAME: str = 'mobile'
+TOKEN_PASSWORD: str = 'secret'
+GROUP_SLUG: str = 'test-slug'
+POST_TEXT: str = 'Тестовый текст'
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.user2 = User.objects.create_user(username=TEST2_USERNAME)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=GROUP_SLUG,
+            description='Тестовое описание',
+        )
+        for i in range(NUM_TEST_POSTS):
+            Post.objects.create(
+                author=cls.user,
+                text=f'{POST_TEXT} {i}',
+                group=cls.group if i % 2 else None,
+            )
+        cls.post = Post.objects.latest('id')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.second_client = Client()
+        self.second_client.force_login(self.user2)
+
+    def send(self, client, method, url, data):
+        return getattr(client, method)(
+            url, json.dumps(data), content_type='application/json')
+
+    def test_token_auth(self):
+        """Клиент без сессии пишет по токену, а сессия требует CSRF."""
+        user = User.objects.create_user(
+            username=TOKEN_USERNAME, password=TOKEN_PASSWORD)
+        client = Client(enforce_csrf_checks=True)
+        url = reverse('api:token')
+        response = self.send(
+            client, 'post', url, {'username': TOKEN_USERNAME, 'password': '?'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        response = self.send(
+            client, 'post', url,
+            {'username': TOKEN_USERNAME, 'password': TOKEN_PASSWORD})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        header = f'Token {response.json()["token"]}'
+        response = client.post(
+            reverse('api:post_list'), json.dumps({'text': 'Пост по токену'}),
+            content_type='application/json', HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertEqual(response.json()['author'], TOKEN_USERNAME)
+        response = client.delete(url, HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        response = client.get(
+            reverse('api:follow_list'), HTTP_AUTHORIZATION=header)
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        client.force_login(user)
+        response = self.send(
+            client, 'post', reverse('api:post_list'), {'text': 'Без CSRF'})
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+    def test_unsupported_media_type(self):
+        """Формы принимаются только в POST, остальное — только JSON."""
+        url = reverse('api:post_detail', args=[self.post.id])
+        response = self.authorized_client.patch(
+            url, 'text=Правка',
+            content_type='application/x-www-form-urlencoded')
+        self.assertEqual(
+            response.status_code, HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+        response = self.authorized_client.post(
+            reverse('api:comment_list', args=[self.post.id]),
+            {'text': 'Комментарий из формы'})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+
+    def test_posts_cursor_pages(self):
+        """Курсор проходит по всем постам без повторов и пропусков."""
+        url = reverse('api:post_list')
+        seen = []
+        response = self.guest_client.get(url, {'limit': 10})
+        while True:
+            data = response.json()
+            seen += [post['id'] for post in data['results']]
+            if not data['next']:
+                break
+            response = self.guest_client.get(
+                url, {'limit': 10, 'cursor': data['next']})
+        expected = list(Post.objects.values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_posts_sparse_fields(self):
+        """?fields= ограничивает поля ответа и колонки запроса."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                reverse('api:post_list'), {'fields': 'id,text'})
+        self.assertEqual(
+            set(response.json()['results'][0]), {'id', 'text'})
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('auth_user', queries[0]['sql'])
+        response = self.guest_client.get(
+            reverse('api:post_list'), {'fields': 'id,password'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_posts_filters(self):
+        """Посты фильтруются по группе и автору."""
+        response = self.guest_client.get(
+            reverse('api:post_list'),
+            {'group': GROUP_SLUG, 'limit': 100, 'fields': 'group'})
+        results = response.json()['results']
+        self.assertEqual(len(results), NUM_TEST_POSTS // 2)
+        self.assertTrue(all(post['group'] == GROUP_SLUG for post in results))
+        response = self.guest_client.get(
+            reverse('api:post_list'), {'author': TEST2_USERNAME})
+        self.assertEqual(response.json()['results'], [])
+
+    def test_etag(self):
+        """Повторный запрос с If-None-Match получает 304."""
+        url = reverse('api:post_detail', args=[self.post.id])
+        response = self.guest_client.get(url)
+        self.assertEqual(response.json()['text'], self.post.text)
+        etag = response['ETag']
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_write(self):
+        """Создавать и менять посты может только автор."""
+        url = reverse('api:post_list')
+        data = {'text': 'Пост из API', 'group': GROUP_SLUG}
+        response = self.send(self.guest_client, 'post', url, data)
+        self.assertEqual(response.status_code, HTTPStatus.UNAUTHORIZED)
+        response = self.send(self.authorized_client, 'post', url, data)
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        post = response.json()
+        self.assertEqual(post['group'], GROUP_SLUG)
+        self.assertEqual(post['author'], TEST_USERNAME)
+        url = reverse('api:post_detail', args=[post['id']])
+        response = self.send(self.second_client, 'patch', url, {'text': '?'})
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+        response = self.send(
+            self.authorized_client, 'patch', url, {'text': 'Правка'})
+        self.assertEqual(response.json()['text'], 'Правка')
+        self.assertEqual(response.json()['group'], GROUP_SLUG)
+        response = self.send(self.authorized_client, 'post', url, {})
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
+        response = self.authorized_client.delete(url)
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Post.objects.filter(pk=post['id']).exists())
+
+    def test_post_bulk(self):
+        """Пакетное чтение и атомарное пакетное создание постов."""
+        ids = list(Post.objects.values_list('id', flat=True)[:3])
+        response = self.guest_client.get(
+            reverse('api:post_bulk'),
+            {'ids': ','.join(map(str, ids)), 'fields': 'text'})
+        self.assertEqual(
+            [post['text'] for post in response.json()['results']],
+            list(Post.objects.filter(pk__in=ids).values_list(
+                'text', flat=True)))
+        count = Post.objects.count()
+        response = self.send(
+            self.authorized_client, 'post', reverse('api:post_bulk'),
+            {'posts': [{'text': 'Один'}, {'text': ''}]})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn('1', response.json()['errors'])
+        self.assertEqual(Post.objects.count(), count)
+        response = self.send(
+            self.authorized_client, 'post', reverse('api:post_bulk'),
+            {'posts': [{'text': 'Один'}, 'Два']})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(
+            response.json()['errors'], {'1': 'Expected an object.'})
+        self.assertEqual(Post.objects.count(), count)
+        response = self.send(
+            self.authorized_client, 'post', reverse('api:post_bulk'),
+            {'posts': [{'text': 'Один'}, {'text': 'Два'}]})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertEqual(
+            [post['text'] for post in response.json()['results']],
+            ['Один', 'Два'])
+        self.assertEqual(Post.objects.count(), count + 2)
+
+    def test_comments(self):
+        """Комментарии создаются и листаются курсором."""
+        url = reverse('api:comment_list', args=[self.post.id])
+        response = self.send(
+            self.second_client, 'post', url, {'text': 'Комментарий'})
+        self.assertEqual(response.status_code, HTTPStatus.CREATED)
+        self.assertEqual(response.json()['author'], TEST2_USERNAME)
+        self.assertTrue(Comment.objects.filter(post=self.post).exists())
+        response = self.guest_client.get(url)
+        self.assertEqual(
+            response.json()['results'][0]['text'], 'Комментарий')
+        response = self.guest_client.get(
+            reverse('api:comment_list', args=[0]))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_groups(self):
+        """Группы доступны списком и по slug."""
+        response = self.guest_client.get(reverse('api:group_list'))
+        self.assertEqual(response.json()['results'][0]['slug'], GROUP_SLUG)
+        response = self.guest_client.get(
+            reverse('api:group_detail', args=[GROUP_SLUG]))
+        self.assertEqual(
+            response.json()['posts_count'], NUM_TEST_POSTS // 2)
+        response = self.guest_client.get(
+            reverse('api:group_detail', args=['missing']))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_follows(self):
+        """Подписки создаются, в том числе пакетно, и удаляются."""
+        url = reverse('api:follow_list')
+        self.assertEqual(
+            self.guest_client.get(url).status_code, HTTPStatus.UNAUTHORIZED)
+        response = self.send(
+            self.second_client, 'post', url, {'author': TEST2_USERNAME})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        response = self.send(
+            self.second_client, 'post', reverse('api:follow_bulk'),
+            {'authors': [{'username': TEST_USERNAME}]})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        response = self.send(
+            self.second_client, 'post', reverse('api:follow_bulk'),
+            {'authors': [TEST_USERNAME]})
+        self.assertEqual(
+            response.json()['results'][0]['author'], TEST_USERNAME)
+        self.assertTrue(
+            Follow.objects.filter(user=self.user2, author=self.user).exists())
+        response = self.second_client.get(url)
+        self.assertEqual(len(response.json()['results']), 1)
+        response = self.second_client.delete(
+            reverse('api:follow_detail', args=[TEST_USERNAME]))
+        self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+        self.assertFalse(Follow.objects.filter(user=self.user2).exists())
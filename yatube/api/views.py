@@ -0,0 +1,349 @@
+import hashlib
+import json
+from functools import wraps
+from http import HTTPStatus
+
+from django.contrib.auth import authenticate
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.utils.cache import get_conditional_response, quote_etag
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from posts.forms import CommentForm, PostForm
+from posts.models import Comment, Follow, Group, Post, User
+from posts.paginators import CursorPaginator
+from posts.views import prepare_thumbnails
+
+from . import serializers
+from .models import Token
+
+PAGE_SIZE: int = 20
+MAX_PAGE_SIZE: int = 100
+MAX_BULK: int = 100
+TOKEN_KEYWORD: str = 'Token'
+FORM_TYPES = ('multipart/form-data', 'application/x-www-form-urlencoded')
+
+
+class ApiError(Exception):
+    def __init__(self, status, errors):
+        super().__init__(errors)
+        self.status = status
+        self.errors = errors
+
+
+def api_view(*methods):
+    """Разрешённые методы, JSON-ошибки и ETag для ответов на GET."""
+    def decorator(view):
+        @csrf_exempt
+        @require_http_methods(methods)
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                authenticate_token(request)
+                data, status = view(request, *args, **kwargs)
+            except ApiError as error:
+                data, status = {'errors': error.errors}, error.status
+            if status == HTTPStatus.NO_CONTENT:
+                return HttpResponse(status=status)
+            response = JsonResponse(data, status=status,
+                                    encoder=DjangoJSONEncoder)
+            if request.method == 'GET' and status == HTTPStatus.OK:
+                etag = quote_etag(hashlib.md5(response.content).hexdigest())
+                response['ETag'] = etag
+                return get_conditional_response(
+                    request, etag=etag, response=response)
+            return response
+        return wrapper
+    return decorator
+
+
+def authenticate_token(request):
+    """Пользователь по заголовку «Authorization: Token <ключ>».
+
+    Клиент с токеном не хранит сессию, и CSRF ему не грозит. Запросы
+    с сессией проверяются на CSRF так же, как обычные формы сайта.
+    """
+    header = request.META.get('HTTP_AUTHORIZATION')
+    if header is None:
+        csrf = CsrfViewMiddleware()
+        if request.user.is_authenticated and csrf.process_view(
+                request, None, (), {}):
+            raise ApiError(HTTPStatus.FORBIDDEN, 'CSRF check failed.')
+        return
+    keyword, _, key = header.partition(' ')
+    user = Token.user_for(key) if keyword == TOKEN_KEYWORD else None
+    if user is None:
+        raise ApiError(HTTPStatus.UNAUTHORIZED, 'Invalid token.')
+    request.user = user
+
+
+def require_user(request):
+    if not request.user.is_authenticated:
+        raise ApiError(HTTPStatus.UNAUTHORIZED, 'Authentication required.')
+
+
+def not_found():
+    return ApiError(HTTPStatus.NOT_FOUND, 'Not found.')
+
+
+def get_payload(request):
+    if request.content_type == 'application/json':
+        try:
+            payload = json.loads(request.body or b'{}')
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'Malformed JSON.')
+        if not isinstance(payload, dict):
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'Expected an object.')
+        return payload, None
+    # Django разбирает формы только в POST: для PATCH тело бы потерялось.
+    if request.method == 'POST' and request.content_type in FORM_TYPES:
+        return request.POST, request.FILES
+    raise ApiError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+                   'Expected application/json.')
+
+
+def get_fields(request, resource):
+    try:
+        return resource.parse_fields(request.GET.get('fields'))
+    except ValueError as error:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f'Unknown fields: {error}.')
+
+
+def get_limit(request):
+    try:
+        limit = int(request.GET.get('limit', PAGE_SIZE))
+    except ValueError:
+        limit = PAGE_SIZE
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def paginate(request, queryset, resource):
+    names = get_fields(request, resource)
+    paginator = CursorPaginator(
+        resource.values(queryset, names), get_limit(request),
+        ordering=resource.ordering)
+    page = paginator.get_page(request.GET.get('cursor'))
+    return {
+        'results': [resource.row(values, names) for values in page],
+        'next': page.next_cursor(),
+        'previous': page.previous_cursor(),
+    }
+
+
+def fetch_one(queryset, resource, names=None):
+    names = names or tuple(resource.fields)
+    values = resource.values(queryset, names).first()
+    if values is None:
+        raise not_found()
+    return resource.row(values, names)
+
+
+def validate(form):
+    if not form.is_valid():
+        raise ApiError(HTTPStatus.BAD_REQUEST, form.errors)
+    return form
+
+
+def post_data(payload, post=None):
+    """Поля формы поста; группа в API задаётся slug, а не первичным ключом."""
+    if not isinstance(payload, dict):
+        raise ApiError(HTTPStatus.BAD_REQUEST, 'Expected an object.')
+    data = payload.copy()
+    if data.get('group'):
+        data['group'] = Group.objects.filter(slug=data['group']).values_list(
+            'pk', flat=True).first() or data['group']
+    if post is not None:
+        data.setdefault('text', post.text)
+        data.setdefault('group', post.group_id)
+    return data
+
+
+def create_post(user, payload, files=None):
+    form = PostForm(post_data(payload), files=files)
+    post = validate(form).save(commit=False)
+    post.author = user
+    post.save()
+    prepare_thumbnails(post)
+    return post
+
+
+def follow(user, username):
+    if not isinstance(username, str):
+        raise ApiError(HTTPStatus.BAD_REQUEST, 'Expected a username.')
+    author = User.objects.filter(username=username).first()
+    if author is None:
+        raise ApiError(HTTPStatus.BAD_REQUEST, f'Unknown author: {username}.')
+    if author == user:
+        raise ApiError(HTTPStatus.BAD_REQUEST, 'Cannot follow yourself.')
+    return Follow.objects.get_or_create(user=user, author=author)
+
+
+@api_view('POST', 'DELETE')
+def token(request):
+    """Выдача ключа по логину и паролю и его отзыв."""
+    if request.method == 'DELETE':
+        require_user(request)
+        Token.objects.filter(user=request.user).delete()
+        return None, HTTPStatus.NO_CONTENT
+    payload, _ = get_payload(request)
+    user = authenticate(
+        request,
+        username=payload.get('username'),
+        password=payload.get('password'),
+    )
+    if user is None:
+        raise ApiError(HTTPStatus.BAD_REQUEST, 'Invalid credentials.')
+    return {'token': Token.issue(user)}, HTTPStatus.CREATED
+
+
+@api_view('GET', 'POST')
+def post_list(request):
+    if request.method == 'POST':
+        require_user(request)
+        post = create_post(request.user, *get_payload(request))
+        return (fetch_one(Post.objects.filter(pk=post.pk), serializers.POST),
+                HTTPStatus.CREATED)
+    posts = Post.objects.all()
+    if request.GET.get('group'):
+        posts = posts.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        posts = posts.filter(author__username=request.GET['author'])
+    return paginate(request, posts, serializers.POST), HTTPStatus.OK
+
+
+@api_view('GET', 'POST')
+def post_bulk(request):
+    """Несколько постов за один запрос: чтение по ?ids= и создание."""
+    resource = serializers.POST
+    if request.method == 'POST':
+        require_user(request)
+        payload, _ = get_payload(request)
+        items = payload.get('posts')
+        if not isinstance(items, list) or not 0 < len(items) <= MAX_BULK:
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           f'Expected 1..{MAX_BULK} posts.')
+        errors = {}
+        with transaction.atomic():
+            ids = []
+            for position, item in enumerate(items):
+                try:
+                    ids.append(create_post(request.user, item).pk)
+                except ApiError as error:
+                    errors[position] = error.errors
+            if errors:
+                raise ApiError(HTTPStatus.BAD_REQUEST, errors)
+    else:
+        try:
+            ids = [int(pk) for pk in request.GET.get('ids', '').split(',')]
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'Expected ?ids=1,2,3.')
+        if len(ids) > MAX_BULK:
+            raise ApiError(HTTPStatus.BAD_REQUEST,
+                           f'At most {MAX_BULK} ids.')
+    names = get_fields(request, resource)
+    rows = {
+        values['id']: resource.row(values, names)
+        for values in resource.values(Post.objects.filter(pk__in=ids),
+                                      names + ('id',))
+    }
+    status = (HTTPStatus.CREATED if request.method == 'POST'
+              else HTTPStatus.OK)
+    return {'results': [rows[pk] for pk in ids if pk in rows]}, status
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+def post_detail(request, post_id):
+    posts = Post.objects.filter(pk=post_id)
+    if request.method == 'GET':
+        names = get_fields(request, serializers.POST)
+        return fetch_one(posts, serializers.POST, names), HTTPStatus.OK
+    require_user(request)
+    post = posts.first()
+    if post is None:
+        raise not_found()
+    if post.author_id != request.user.pk:
+        raise ApiError(HTTPStatus.FORBIDDEN, 'Only the author may do this.')
+    if request.method == 'DELETE':
+        post.delete()
+        return None, HTTPStatus.NO_CONTENT
+    payload, _ = get_payload(request)
+    validate(PostForm(post_data(payload, post), instance=post)).save()
+    return fetch_one(posts, serializers.POST), HTTPStatus.OK
+
+
+@api_view('GET', 'POST')
+def comment_list(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise not_found()
+    if request.method == 'POST':
+        require_user(request)
+        payload, _ = get_payload(request)
+        comment = validate(CommentForm(payload)).save(commit=False)
+        comment.author = request.user
+        comment.post_id = post_id
+        comment.save()
+        return (fetch_one(Comment.objects.filter(pk=comment.pk),
+                          serializers.COMMENT),
+                HTTPStatus.CREATED)
+    comments = Comment.objects.filter(post_id=post_id)
+    return paginate(request, comments, serializers.COMMENT), HTTPStatus.OK
+
+
+@api_view('GET')
+def group_list(request):
+    return (paginate(request, Group.objects.all(), serializers.GROUP),
+            HTTPStatus.OK)
+
+
+@api_view('GET')
+def group_detail(request, slug):
+    names = get_fields(request, serializers.GROUP)
+    return (fetch_one(Group.objects.filter(slug=slug), serializers.GROUP,
+                      names),
+            HTTPStatus.OK)
+
+
+@api_view('GET', 'POST')
+def follow_list(request):
+    require_user(request)
+    if request.method == 'POST':
+        payload, _ = get_payload(request)
+        instance, created = follow(request.user, payload.get('author'))
+        return (fetch_one(Follow.objects.filter(pk=instance.pk),
+                          serializers.FOLLOW),
+                HTTPStatus.CREATED if created else HTTPStatus.OK)
+    follows = Follow.objects.filter(user=request.user)
+    return paginate(request, follows, serializers.FOLLOW), HTTPStatus.OK
+
+
+@api_view('POST')
+def follow_bulk(request):
+    require_user(request)
+    payload, _ = get_payload(request)
+    authors = payload.get('authors')
+    if not isinstance(authors, list) or not 0 < len(authors) <= MAX_BULK:
+        raise ApiError(HTTPStatus.BAD_REQUEST,
+                       f'Expected 1..{MAX_BULK} authors.')
+    with transaction.atomic():
+        for username in authors:
+            follow(request.user, username)
+    follows = Follow.objects.filter(
+        user=request.user, author__username__in=authors)
+    resource = serializers.FOLLOW
+    names = tuple(resource.fields)
+    return ({'results': [resource.row(values, names)
+                         for values in resource.values(follows, names)]},
+            HTTPStatus.OK)
+
+
+@api_view('DELETE')
+def follow_detail(request, username):
+    require_user(request)
+    deleted, _ = Follow.objects.filter(
+        user=request.user, author__username=username).delete()
+    if not deleted:
+        raise not_found()
+    return None, HTTPStatus.NO_CONTENT
@@ -0,0 +1,153 @@
+"""Сравнение конкурентной записи в SQLite с журналом DELETE и WAL.
+
+Несколько процессов-писателей, как воркеры gunicorn, публикуют посты:
+вставка поста и обновление счётчика автора в одной транзакции, как это
+делают post_create и сигналы. Процессы-читатели тем временем выбирают
+страницу ленты.
+
+    python benchmarks/db_writes.py --writers 4 --readers 4 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from yatube.databases import SQLITE_PRAGMAS  # noqa: E402
+
+MODES = {
+    # Настройки Django по умолчанию.
+    'delete': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+    'wal': SQLITE_PRAGMAS,
+}
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'text TEXT, pub_date REAL)',
+    'CREATE INDEX post_pub_date ON post (pub_date)',
+    'CREATE TABLE stats (user_id INTEGER PRIMARY KEY, posts_count INTEGER)',
+)
+AUTHORS: int = 100
+TIMEOUT: int = 20
+
+
+def connect(path, pragmas):
+    connection = sqlite3.connect(
+        path, timeout=TIMEOUT, isolation_level=None)
+    for name, value in pragmas.items():
+        connection.execute(f'PRAGMA {name} = {value}')
+    return connection
+
+
+def prepare(path, pragmas):
+    connection = connect(path, pragmas)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    connection.executemany(
+        'INSERT INTO stats VALUES (?, 0)', [(i,) for i in range(AUTHORS)])
+    connection.close()
+
+
+def write(path, pragmas, deadline, results, worker):
+    connection = connect(path, pragmas)
+    latencies, errors, number = [], 0, 0
+    while time.time() < deadline:
+        author = (worker * 7919 + number) % AUTHORS
+        number += 1
+        started = time.perf_counter()
+        try:
+            connection.execute('BEGIN')
+            connection.execute(
+                'INSERT INTO post (author_id, text, pub_date) '
+                'VALUES (?, ?, ?)', (author, 'x' * 200, time.time()))
+            connection.execute(
+                'UPDATE stats SET posts_count = posts_count + 1 '
+                'WHERE user_id = ?', (author,))
+            connection.execute('COMMIT')
+        except sqlite3.OperationalError:
+            if connection.in_transaction:
+                connection.execute('ROLLBACK')
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    results.put(('write', latencies, errors))
+
+
+def read(path, pragmas, deadline, results, worker):
+    connection = connect(path, pragmas)
+    latencies, errors = [], 0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.execute(
+                'SELECT * FROM post ORDER BY pub_date DESC LIMIT 10'
+            ).fetchall()
+        except sqlite3.OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    results.put(('read', latencies, errors))
+
+
+def run(mode, writers, readers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        pragmas = MODES[mode]
+        prepare(path, pragmas)
+        results = multiprocessing.Queue()
+        deadline = time.time() + seconds
+        processes = [
+            multiprocessing.Process(
+                target=target, args=(path, pragmas, deadline, results, i))
+            for target, count in ((write, writers), (read, readers))
+            for i in range(count)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    report = {}
+    for kind in ('write', 'read'):
+        latencies = sorted(
+            value for name, values, _ in collected if name == kind
+            for value in values)
+        report[kind] = {
+            'per_second': len(latencies) / seconds,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'errors': sum(
+                errors for name, _, errors in collected if name == kind),
+        }
+    return report
+
+
+def percentile(values, rank):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, len(values) * rank // 100)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--mode', choices=MODES, action='append')
+    options = parser.parse_args()
+    print(f"{'mode':<8}{'kind':<7}{'per sec':>10}{'p50 ms':>10}"
+          f"{'p95 ms':>10}{'errors':>8}")
+    for mode in options.mode or MODES:
+        report = run(mode, options.writers, options.readers, options.seconds)
+        for kind, row in report.items():
+            print(f"{mode:<8}{kind:<7}{row['per_second']:>10.0f}"
+                  f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                  f"{row['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from django.core.signals import request_started
+        from django.db.backends.signals import connection_created
+
+        from . import checks, db  # noqa: F401
+        connection_created.connect(db.apply_pragmas)
+        request_started.connect(db.check_connections)
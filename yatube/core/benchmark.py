@@ -0,0 +1,284 @@
+"""Нагрузочный прогон всех маршрутов posts, users и about.
+
+Запросы выполняются в процессе через django.test.Client параллельными
+потоками и проходят весь стек middleware, поэтому вместе с задержкой
+известно и число SQL-запросов каждого ответа.
+"""
+import importlib
+import logging
+import queue
+import random
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Group, Post, User, UserStats
+
+URL_MODULES = ('posts.urls', 'users.urls', 'about.urls')
+OK_STATUSES = frozenset((200, 301, 302, 304))
+# Код, которым считается исключение во вьюхе
+ERROR_STATUS: int = 500
+
+logger = logging.getLogger(__name__)
+SAMPLE_SIZE: int = 1000
+GUEST: str = 'guest'
+USER: str = 'user'
+# Свежая сессия на каждый запрос, например для выхода из аккаунта.
+FRESH: str = 'fresh'
+# Число запросов у подписки и отписки зависит от того, была ли она уже.
+QUERY_SLACK: int = 1
+
+
+class Scenario:
+    def __init__(self, name, client, build):
+        self.name = name
+        self.client = client
+        self.build = build
+
+
+def get(*args, **params):
+    """Собирает GET-запрос к маршруту по имени и аргументам."""
+    def build(data):
+        path = reverse(args[0], args=[
+            arg(data) if callable(arg) else arg for arg in args[1:]])
+        query = {
+            name: value(data) if callable(value) else value
+            for name, value in params.items()
+        }
+        return 'get', f'{path}?{urlencode(query)}' if query else path, None
+    return build
+
+
+def post(name, *args, payload):
+    def build(data):
+        path = reverse(name, args=[arg(data) for arg in args])
+        return 'post', path, payload
+    return build
+
+
+def pick(key):
+    return lambda data: random.choice(data[key])
+
+
+def own_post(data):
+    return random.choice(data['own_posts'])
+
+
+SCENARIOS = [
+    Scenario('posts:index', GUEST, get('posts:index')),
+    Scenario('posts:index', GUEST, get(
+        'posts:index', page=lambda data: random.randint(1, 50))),
+    Scenario('posts:group_list', GUEST, get(
+        'posts:group_list', pick('groups'))),
+    Scenario('posts:profile', GUEST, get('posts:profile', pick('users'))),
+    Scenario('posts:search', GUEST, get('posts:search', q=pick('words'))),
+    Scenario('posts:post_detail', GUEST, get(
+        'posts:post_detail', pick('posts'))),
+    Scenario('posts:post_comments', GUEST, get(
+        'posts:post_comments', pick('posts'))),
+    Scenario('posts:post_create', USER, get('posts:post_create')),
+    Scenario('posts:post_edit', USER, get('posts:post_edit', own_post)),
+    Scenario('posts:add_comment', USER, post(
+        'posts:add_comment', pick('posts'),
+        payload={'text': 'Комментарий нагрузочного теста'})),
+    Scenario('posts:follow_index', USER, get('posts:follow_index')),
+    Scenario('posts:live_updates', GUEST, get(
+        'posts:live_updates', 'index', since=0)),
+    Scenario('posts:profile_follow', USER, get(
+        'posts:profile_follow', pick('users'))),
+    Scenario('posts:profile_unfollow', USER, get(
+        'posts:profile_unfollow', pick('users'))),
+    Scenario('posts:notifications', USER, get('posts:notifications')),
+    Scenario('posts:notifications_read', USER, post(
+        'posts:notifications_read', payload={})),
+    Scenario('users:login', GUEST, get('users:login')),
+    Scenario('users:logout', FRESH, get('users:logout')),
+    Scenario('users:signup', GUEST, get('users:signup')),
+    Scenario('users:password_change_form', USER, get(
+        'users:password_change_form')),
+    Scenario('users:password_change_done', USER, get(
+        'users:password_change_done')),
+    Scenario('users:password_reset_form', GUEST, get(
+        'users:password_reset_form')),
+    Scenario('users:password_reset_done', GUEST, get(
+        'users:password_reset_done')),
+    Scenario('users:password_reset_confirm', GUEST, get(
+        'users:password_reset_confirm', 'MQ', 'set-password')),
+    Scenario('users:password_reset_complete', GUEST, get(
+        'users:password_reset_complete')),
+    Scenario('about:author', GUEST, get('about:author')),
+    Scenario('about:tech', GUEST, get('about:tech')),
+]
+
+
+def route_names():
+    names = set()
+    for module_name in URL_MODULES:
+        module = importlib.import_module(module_name)
+        names.update(
+            f'{module.app_name}:{pattern.name}'
+            for pattern in module.urlpatterns if pattern.name
+        )
+    return names
+
+
+def missing_routes(scenarios=SCENARIOS):
+    return sorted(route_names() - {scenario.name for scenario in scenarios})
+
+
+def sample_data():
+    """Случайные существующие объекты, к которым обращаются сценарии."""
+    stats = UserStats.objects.filter(
+        posts_count__gt=0, following_count__gt=0
+    ).order_by('-following_count').first()
+    if stats is None:
+        raise ValueError('No user with posts and follows; seed data first.')
+    user = stats.user
+    posts = list(Post.objects.values_list('pk', flat=True)[:SAMPLE_SIZE])
+    texts = Post.objects.values_list('text', flat=True)[:SAMPLE_SIZE]
+    return {
+        'user': user,
+        'users': list(User.objects.exclude(pk=user.pk).values_list(
+            'username', flat=True)[:SAMPLE_SIZE]),
+        'groups': list(Group.objects.values_list(
+            'slug', flat=True)[:SAMPLE_SIZE]),
+        'posts': posts,
+        'own_posts': list(user.posts.values_list(
+            'pk', flat=True)[:SAMPLE_SIZE]),
+        'words': sorted({
+            word for text in texts for word in text.split()[:3]
+            if len(word) > 3
+        }) or ['пост'],
+    }
+
+
+def run(total, concurrency, seed=None, scenarios=SCENARIOS):
+    """Выполняет total запросов в concurrency потоков.
+
+    Возвращает время выполнения и список замеров
+    (маршрут, секунды, число SQL-запросов, код ответа).
+    """
+    data = sample_data()
+    random.seed(seed)
+    jobs = queue.Queue()
+    for number in range(total):
+        jobs.put(scenarios[number % len(scenarios)])
+    samples = []
+    lock = threading.Lock()
+
+    def worker():
+        clients = {GUEST: ThreadClient(), USER: ThreadClient()}
+        clients[USER].force_login(data['user'])
+        measured = []
+        while True:
+            try:
+                scenario = jobs.get_nowait()
+            except queue.Empty:
+                break
+            client = clients.get(scenario.client)
+            if client is None:
+                client = ThreadClient()
+                client.force_login(data['user'])
+            method, path, payload = scenario.build(data)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                status = send(client, method, path, payload)
+                elapsed = time.perf_counter() - started
+            measured.append(
+                (scenario.name, elapsed, len(queries), status))
+        connection.close()
+        with lock:
+            samples.extend(measured)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, samples
+
+
+class ThreadClient(Client):
+    """Тестовый клиент, который видит исключения только своего потока.
+
+    Клиент подписан на общий сигнал got_request_exception, и без этой
+    проверки ошибку вьюхи получил бы и запрос соседнего потока.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.thread = threading.get_ident()
+
+    def store_exc_info(self, **kwargs):
+        if threading.get_ident() == self.thread:
+            super().store_exc_info(**kwargs)
+
+
+def send(client, method, path, payload):
+    try:
+        return getattr(client, method)(path, payload).status_code
+    except Exception:
+        # Упавший запрос — ошибка в отчёте, а не конец потока.
+        logger.exception('%s %s failed', method.upper(), path)
+        return ERROR_STATUS
+
+
+def summarize(duration, samples):
+    routes = defaultdict(list)
+    for name, elapsed, queries, status in samples:
+        routes[name].append((elapsed, queries, status))
+    report = {
+        'requests': len(samples),
+        'throughput': round(len(samples) / duration, 1) if duration else 0,
+        'routes': {},
+    }
+    for name, measured in sorted(routes.items()):
+        timings = sorted(elapsed for elapsed, _, _ in measured)
+        report['routes'][name] = {
+            'requests': len(measured),
+            'errors': sum(
+                status not in OK_STATUSES for _, _, status in measured),
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'p99_ms': percentile(timings, 99),
+            'queries': round(
+                sum(queries for _, queries, _ in measured) / len(measured),
+                1),
+        }
+    return report
+
+
+def percentile(values, rank):
+    """Процентиль по ближайшему рангу, в миллисекундах."""
+    if not values:
+        return 0.0
+    index = max(0, -(-len(values) * rank // 100) - 1)
+    return round(values[index] * 1000, 2)
+
+
+def compare(report, baseline, tolerance):
+    """Маршруты, где p95 или число запросов хуже базовой линии."""
+    regressions = []
+    for name, current in report['routes'].items():
+        previous = baseline['routes'].get(name)
+        if previous is None:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if current['queries'] > previous['queries'] + QUERY_SLACK:
+            regressions.append(
+                f"{name}: queries {previous['queries']} -> "
+                f"{current['queries']}")
+    if report['throughput'] < baseline['throughput'] * (1 - tolerance):
+        regressions.append(
+            f"throughput {baseline['throughput']} -> "
+            f"{report['throughput']} req/s")
+    return regressions
@@ -0,0 +1,77 @@
+import random
+import time
+
+from django.core.cache import cache as default_cache
+
+from . import metrics
+from .routers import primary
+
+JITTER: float = 0.1
+LOCK_TIMEOUT: int = 30
+LOCK_WAIT: float = 1.0
+LOCK_POLL: float = 0.05
+
+
+def get_or_compute(key, compute, timeout, version=None, cache=None,
+                   on_stale=None):
+    """Значение из кэша с защитой от одновременного пересчёта.
+
+    Запись хранит значение, версию и момент устаревания, а живёт в кэше
+    вдвое дольше timeout. Устаревшую или другой версии запись
+    пересчитывает только получивший блокировку процесс; остальные тем
+    временем отдают старое значение и вызывают on_stale. Время жизни
+    случайно сдвигается на JITTER, чтобы записи не устаревали все разом.
+    Пересчёт читает с основной базы, а не с реплики.
+    """
+    cache = cache or default_cache
+    entry = cache.get(key)
+    if entry is not None and is_fresh(entry, version):
+        metrics.record_cache(hit=True)
+        return entry[0]
+    metrics.record_cache(hit=False)
+    lock_key = f'{key}:lock'
+    if not cache.add(lock_key, 1, LOCK_TIMEOUT):
+        if entry is not None:
+            if on_stale is not None:
+                on_stale()
+            return entry[0]
+        entry = wait_for(cache, key, lock_key)
+        if entry is not None:
+            return entry[0]
+        return compute()
+    try:
+        with primary():
+            value = compute()
+        ttl = jittered(timeout)
+        stale_until = None if ttl is None else ttl * 2
+        cache.set(key, (value, version, expires_at(ttl)), stale_until)
+    finally:
+        cache.delete(lock_key)
+    return value
+
+
+def is_fresh(entry, version):
+    _, entry_version, fresh_until = entry
+    return entry_version == version and (
+        fresh_until is None or fresh_until > time.time())
+
+
+def jittered(timeout):
+    if timeout is None:
+        return None
+    return timeout * random.uniform(1 - JITTER, 1)
+
+
+def expires_at(ttl):
+    return None if ttl is None else time.time() + ttl
+
+
+def wait_for(cache, key, lock_key):
+    """Ждёт, пока пересчёт, начатый другим процессом, закончится."""
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL)
+        entry = cache.get(key)
+        if entry is not None or cache.get(lock_key) is None:
+            return entry
+    return None
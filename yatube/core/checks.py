@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+SHARED_CACHE_BACKENDS = frozenset((
+    'django_redis.cache.RedisCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django.core.cache.backends.memcached.MemcachedCache',
+    # Общий только для процессов одного хоста
+    'core.sqlite_cache.SQLiteCache',
+))
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Воркерам сервера нужен общий кэш с атомарными add() и incr()."""
+    if settings.CACHES['default']['BACKEND'] in SHARED_CACHE_BACKENDS:
+        return []
+    return [Warning(
+        'Кэш по умолчанию не общий для процессов сервера.',
+        hint=(
+            'Задайте CACHE_URL вида sqlite://, redis:// или memcached://, '
+            'если сервер запущен в нескольких процессах: иначе версии '
+            'лент, блокировки и счётчики у каждого процесса свои.'
+        ),
+        id='core.W001',
+    )]
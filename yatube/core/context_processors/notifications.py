@@ -0,0 +1,11 @@
+from functools import partial
+
+from posts.notifications import unread_count
+
+
+def notifications(request):
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    # Счётчик читается из кэша только там, где его выводит шаблон.
+    return {'unread_notifications': partial(unread_count, user.pk)}
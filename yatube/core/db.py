@@ -0,0 +1,23 @@
+from django.db import connections
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    pragmas = connection.settings_dict.get('PRAGMAS')
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def check_connections(**kwargs):
+    """Закрывает оборвавшиеся постоянные соединения в начале запроса.
+
+    В Django 2.2 нет CONN_HEALTH_CHECKS, поэтому без проверки первый
+    запрос после перезапуска базы или пулера падает с ошибкой.
+    """
+    for connection in connections.all():
+        if (connection.settings_dict.get('CONN_HEALTH_CHECKS')
+                and connection.connection is not None
+                and not connection.is_usable()):
+            connection.close()
@@ -0,0 +1,88 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmark
+from posts.models import Comment, Follow, Post, User
+
+BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает все маршруты posts, users и about и сравнивает '
+        'p50/p95/p99, число SQL-запросов и пропускную способность '
+        'с базовой линией'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument(
+            '--baseline', default=BASELINE,
+            help='JSON с результатами прошлого прогона для сравнения',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='записать результаты прогона как новую базовую линию',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='допустимое ухудшение p95 и пропускной способности',
+        )
+
+    def handle(self, *args, **options):
+        missing = benchmark.missing_routes()
+        if missing:
+            raise CommandError(
+                f"Нет сценариев для маршрутов: {', '.join(missing)}")
+        try:
+            duration, samples = benchmark.run(
+                options['requests'], options['concurrency'], options['seed'])
+        except ValueError as error:
+            raise CommandError(error)
+        report = benchmark.summarize(duration, samples)
+        report['dataset'] = {
+            'users': User.objects.count(),
+            'posts': Post.objects.count(),
+            'follows': Follow.objects.count(),
+            'comments': Comment.objects.count(),
+        }
+        report['concurrency'] = options['concurrency']
+        self.print_report(report)
+        if options['save_baseline']:
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(
+                self.style.SUCCESS(f"Базовая линия: {options['baseline']}"))
+            return
+        if not os.path.exists(options['baseline']):
+            return
+        with open(options['baseline'], encoding='utf-8') as file:
+            baseline = json.load(file)
+        regressions = benchmark.compare(
+            report, baseline, options['tolerance'])
+        if regressions:
+            raise CommandError(
+                'Ухудшения относительно базовой линии:\n'
+                + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS('Ухудшений нет'))
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{'route':<36}{'n':>6}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'p99 ms':>9}{'queries':>9}"
+        )
+        for name, row in report['routes'].items():
+            self.stdout.write(
+                f"{name:<36}{row['requests']:>6}{row['errors']:>5}"
+                f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}"
+                f"{row['queries']:>9}"
+            )
+        self.stdout.write(
+            f"{report['requests']} запросов, "
+            f"{report['throughput']} запросов в секунду"
+        )
@@ -0,0 +1,140 @@
+"""Метрики запросов по именам вьюх в формате Prometheus.
+
+Счётчики живут в памяти процесса: каждый воркер отдаёт свои, а
+суммирует их Prometheus. Замер одного запроса собирается в
+RequestMetrics, а в общий реестр попадает один раз, в конце запроса.
+"""
+import threading
+import time
+from collections import defaultdict
+
+# Границы корзин гистограммы времени ответа, в секундах
+BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+COUNTERS = (
+    ('requests', 'Обработанные запросы'),
+    ('errors', 'Ответы с кодом 5xx'),
+    ('db_queries', 'SQL-запросы'),
+    ('db_seconds', 'Время SQL-запросов, секунды'),
+    ('template_seconds', 'Время рендеринга шаблонов, секунды'),
+    ('cache_hits', 'Попадания в кэш'),
+    ('cache_misses', 'Промахи кэша'),
+    ('response_bytes', 'Размер ответов, байты'),
+)
+PREFIX: str = 'yatube'
+
+state = threading.local()
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.template_seconds = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка connection.execute_wrapper, замеряет каждый запрос."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((time.perf_counter() - started, sql))
+
+    @property
+    def db_seconds(self):
+        return sum(duration for duration, _ in self.queries)
+
+    def top_queries(self, limit):
+        return sorted(self.queries, reverse=True)[:limit]
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(lambda: defaultdict(float))
+        self.durations = defaultdict(lambda: [0] * len(BUCKETS))
+
+    def record(self, view, measured, status, size, duration):
+        with self.lock:
+            counters = self.counters[view]
+            counters['requests'] += 1
+            counters['errors'] += status >= 500
+            counters['db_queries'] += len(measured.queries)
+            counters['db_seconds'] += measured.db_seconds
+            counters['template_seconds'] += measured.template_seconds
+            counters['cache_hits'] += measured.cache_hits
+            counters['cache_misses'] += measured.cache_misses
+            counters['response_bytes'] += size
+            counters['duration_seconds'] += duration
+            buckets = self.durations[view]
+            for index, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    buckets[index] += 1
+
+    def render(self):
+        """Текстовый формат экспорта Prometheus 0.0.4."""
+        with self.lock:
+            counters = {
+                view: dict(values) for view, values in self.counters.items()}
+            durations = {
+                view: list(values) for view, values in self.durations.items()}
+        lines = []
+        for name, help_text in COUNTERS:
+            metric = f'{PREFIX}_{name}_total'
+            lines.append(f'# HELP {metric} {help_text}')
+            lines.append(f'# TYPE {metric} counter')
+            for view, values in sorted(counters.items()):
+                lines.append(
+                    f'{metric}{{view="{view}"}} {number(values[name])}')
+        metric = f'{PREFIX}_request_duration_seconds'
+        lines.append(f'# HELP {metric} Время ответа, секунды')
+        lines.append(f'# TYPE {metric} histogram')
+        for view, buckets in sorted(durations.items()):
+            values = counters[view]
+            for bound, count in zip(BUCKETS, buckets):
+                lines.append(
+                    f'{metric}_bucket{{view="{view}",le="{bound}"}} {count}')
+            lines.append(
+                f'{metric}_bucket{{view="{view}",le="+Inf"}} '
+                f'{number(values["requests"])}')
+            lines.append(
+                f'{metric}_sum{{view="{view}"}} '
+                f'{number(values["duration_seconds"])}')
+            lines.append(
+                f'{metric}_count{{view="{view}"}} '
+                f'{number(values["requests"])}')
+        return '\n'.join(lines) + '\n'
+
+    def clear(self):
+        with self.lock:
+            self.counters.clear()
+            self.durations.clear()
+
+
+def number(value):
+    return int(value) if float(value).is_integer() else round(value, 6)
+
+
+registry = Registry()
+
+
+def current():
+    """Замер текущего запроса или None вне MetricsMiddleware."""
+    return getattr(state, 'request', None)
+
+
+def record_cache(hit):
+    measured = current()
+    if measured is None:
+        return
+    if hit:
+        measured.cache_hits += 1
+    else:
+        measured.cache_misses += 1
+
+
+def record_template(seconds):
+    measured = current()
+    if measured is not None:
+        measured.template_seconds += seconds
@@ -0,0 +1,118 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+from . import metrics
+from .routers import state
+
+PIN_COOKIE: str = 'primary_pin'
+SAFE_METHODS = frozenset(('GET', 'HEAD'))
+SLOW_QUERIES_LOGGED: int = 5
+
+logger = logging.getLogger('yatube.slow_requests')
+
+
+class ReplicaPinMiddleware:
+    """Читать с реплик после собственной записи пользователю нельзя.
+
+    Если запрос что-то записал, ответ ставит куку на
+    REPLICA_PIN_SECONDS — дольше типичного отставания реплик. Пока кука
+    жива, все запросы пользователя читают с основной базы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state.use_replica = False
+        state.read_replica = False
+        state.wrote = False
+        try:
+            response = self.get_response(request)
+            wrote = state.wrote
+            # По ней кэш страниц узнаёт, что ответ читал с реплики.
+            request.read_replica = state.read_replica
+        finally:
+            state.use_replica = False
+            state.read_replica = False
+            state.wrote = False
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state.use_replica = (
+            request.method in SAFE_METHODS
+            and getattr(view_func, 'read_from_replica', False)
+            and PIN_COOKIE not in request.COOKIES
+        )
+
+
+class MetricsMiddleware:
+    """Считает SQL-запросы, время шаблонов, кэш и размер ответа по вьюхам.
+
+    Запросы медленнее SLOW_REQUEST_SECONDS пишутся в лог вместе с самыми
+    долгими SQL-запросами.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        measured = metrics.RequestMetrics()
+        metrics.state.request = measured
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(measured))
+                response = self.get_response(request)
+        finally:
+            metrics.state.request = None
+        duration = time.perf_counter() - measured.started
+        view = view_name(request)
+        metrics.registry.record(
+            view, measured, response.status_code,
+            0 if response.streaming else len(response.content), duration,
+        )
+        # Долгий опрос ждёт новых постов намеренно.
+        if duration >= settings.SLOW_REQUEST_SECONDS and not getattr(
+                request, 'long_running', False):
+            log_slow_request(request, view, measured, duration)
+        return response
+
+
+def view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        # Ответ отдан из кэша страниц до разбора адреса.
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return 'unresolved'
+    return match.view_name
+
+
+def log_slow_request(request, view, measured, duration):
+    top = ''.join(
+        f'\n  {seconds * 1000:.1f} ms: {sql}'
+        for seconds, sql in measured.top_queries(SLOW_QUERIES_LOGGED)
+    )
+    logger.warning(
+        'Slow request %s %s (%s): %.0f ms, %d queries, %.0f ms SQL, '
+        '%.0f ms templates%s',
+        request.method, request.get_full_path(), view, duration * 1000,
+        len(measured.queries), measured.db_seconds * 1000,
+        measured.template_seconds * 1000, top,
+    )
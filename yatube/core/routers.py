@@ -0,0 +1,77 @@
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Сессии и пользователи читаются с основной базы: вход должен быть
+# виден сразу, даже если ответ с кукой закрепления ещё не дошёл.
+PRIMARY_APPS = frozenset(('sessions', 'auth'))
+# Служебные записи не закрепляют пользователя за основной базой.
+UNPINNED_APPS = frozenset(('sessions', 'thumbnail', 'tasks'))
+
+state = threading.local()
+
+
+class ReplicaRouter:
+    """Чтение в помеченных вьюхах уходит на реплики, запись — на основную.
+
+    Реплики перечислены в settings.DATABASE_REPLICAS. Запрос читает с
+    реплики, только если ReplicaPinMiddleware разрешила это для него:
+    безопасный метод, вьюха помечена read_from_replica, а пользователь
+    недавно ничего не записывал.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (replicas and getattr(state, 'use_replica', False)
+                and model._meta.app_label not in PRIMARY_APPS):
+            state.read_replica = True
+            return random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label not in UNPINNED_APPS:
+            state.wrote = True
+        instance = hints.get('instance')
+        if (instance is not None
+                and instance._state.db in settings.DATABASE_REPLICAS):
+            # Объект, прочитанный с реплики, сохраняется в основную базу.
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схему на реплики переносит репликация.
+        return db not in settings.DATABASE_REPLICAS
+
+
+@contextmanager
+def primary():
+    """Чтение внутри блока идёт с основной базы.
+
+    Так читается всё, что сохраняется в кэш под текущими версиями лент:
+    отстающая реплика вернула бы строки до их смены.
+    """
+    use_replica = getattr(state, 'use_replica', False)
+    state.use_replica = False
+    try:
+        yield
+    finally:
+        state.use_replica = use_replica
+
+
+def read_from_replica(view):
+    """Помечает вьюху, чьи запросы на чтение можно отдать реплике."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return view(request, *args, **kwargs)
+    wrapper.read_from_replica = True
+    return wrapper
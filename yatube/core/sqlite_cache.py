@@ -0,0 +1,203 @@
+"""Кэш в файле SQLite, общий для всех процессов одного хоста.
+
+Запись идёт в транзакциях BEGIN IMMEDIATE, поэтому add() и incr()
+атомарны и между процессами: на них держатся блокировки от
+одновременного пересчёта и счётчики. Чистка по MAX_ENTRIES удаляет
+только записи со сроком жизни, а вечные ключи версий лент не трогает.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# Число записей между проверками размера кэша
+CULL_INTERVAL: int = 100
+# Старые сборки SQLite принимают не больше 999 параметров в запросе
+BATCH_SIZE: int = 500
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self.path = location
+        self.local = threading.local()
+        self.writes = 0
+
+    def connection(self):
+        """Своё соединение у каждого потока и у каждого процесса."""
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None and self.local.pid == os.getpid():
+            return connection
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(
+            self.path, timeout=20, isolation_level=None,
+            check_same_thread=False)
+        connection.execute('PRAGMA journal_mode = WAL')
+        connection.execute('PRAGMA synchronous = NORMAL')
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)')
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires)')
+        self.local.connection = connection
+        self.local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def transaction(self):
+        connection = self.connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        row = self.connection().execute(
+            'SELECT value FROM cache '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.key(key, version), time.time()),
+        ).fetchone()
+        return default if row is None else pickle.loads(row[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self.key(key, version): key for key in keys}
+        found = {}
+        for batch in batches(list(keys)):
+            rows = self.connection().execute(
+                f'SELECT key, value FROM cache '
+                f'WHERE key IN ({placeholders(batch)}) '
+                f'AND (expires IS NULL OR expires > ?)',
+                (*batch, time.time()),
+            )
+            found.update(
+                (keys[key], pickle.loads(value)) for key, value in rows)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = [
+            (self.key(key, version),
+             pickle.dumps(value, pickle.HIGHEST_PROTOCOL), expires)
+            for key, value in data.items()
+        ]
+        with self.transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)', rows)
+            self.written(connection, len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.key(key, version)
+        with self.transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time()))
+            added = connection.execute(
+                'INSERT OR IGNORE INTO cache (key, value, expires) '
+                'VALUES (?, ?, ?)',
+                (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+                 self.get_backend_timeout(timeout)),
+            ).rowcount == 1
+            if added:
+                self.written(connection, 1)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        key = self.key(key, version)
+        with self.transaction() as connection:
+            row = connection.execute(
+                'SELECT value FROM cache '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key))
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        with self.transaction() as connection:
+            return connection.execute(
+                'UPDATE cache SET expires = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout),
+                 self.key(key, version), time.time()),
+            ).rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self.connection().execute(
+            'SELECT 1 FROM cache '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.key(key, version), time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.key(key, version) for key in keys]
+        for batch in batches(keys):
+            with self.transaction() as connection:
+                connection.execute(
+                    f'DELETE FROM cache WHERE key IN ({placeholders(batch)})',
+                    batch)
+
+    def clear(self):
+        with self.transaction() as connection:
+            connection.execute('DELETE FROM cache')
+
+    def written(self, connection, count):
+        self.writes += count
+        if self.writes >= CULL_INTERVAL:
+            self.writes = 0
+            self.cull(connection)
+
+    def cull(self, connection):
+        """Удаляет просроченные записи и лишние записи со сроком жизни.
+
+        Если последних больше MAX_ENTRIES, удаляется доля 1/CULL_FREQUENCY
+        ближайших к устареванию.
+        """
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),))
+        count, = connection.execute(
+            'SELECT COUNT(*) FROM cache WHERE expires IS NOT NULL'
+        ).fetchone()
+        if count <= self._max_entries:
+            return
+        limit = count if self._cull_frequency == 0 else (
+            count // self._cull_frequency)
+        connection.execute(
+            'DELETE FROM cache WHERE key IN ('
+            'SELECT key FROM cache WHERE expires IS NOT NULL '
+            'ORDER BY expires LIMIT ?)', (limit,))
+
+
+def batches(items):
+    for start in range(0, len(items), BATCH_SIZE):
+        yield items[start:start + BATCH_SIZE]
+
+
+def placeholders(batch):
+    return ', '.join('?' * len(batch))
@@ -0,0 +1,93 @@
+from django import template
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.utils import make_template_fragment_key
+
+from core.cache import get_or_compute
+
+register = template.Library()
+
+
+class StampedeCacheNode(template.Node):
+    def __init__(self, nodelist, expire_time, fragment_name, vary_on,
+                 cache_name, version):
+        self.nodelist = nodelist
+        self.expire_time = expire_time
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+        self.cache_name = cache_name
+        self.version = version
+
+    def render(self, context):
+        try:
+            expire_time = self.expire_time.resolve(context)
+        except template.VariableDoesNotExist:
+            raise template.TemplateSyntaxError(
+                f'"cache" tag got an unknown variable: '
+                f'{self.expire_time.var!r}')
+        if expire_time is not None:
+            try:
+                expire_time = int(expire_time)
+            except (ValueError, TypeError):
+                raise template.TemplateSyntaxError(
+                    f'"cache" tag got a non-integer timeout value: '
+                    f'{expire_time!r}')
+        key = make_template_fragment_key(
+            self.fragment_name,
+            [var.resolve(context) for var in self.vary_on],
+        )
+        version = self.version and self.version.resolve(context)
+        return get_or_compute(
+            key,
+            lambda: self.nodelist.render(context),
+            expire_time,
+            version=version,
+            cache=self.get_cache(context),
+            on_stale=lambda: mark_stale(context),
+        )
+
+    def get_cache(self, context):
+        if self.cache_name:
+            return caches[self.cache_name.resolve(context)]
+        try:
+            return caches['template_fragments']
+        except InvalidCacheBackendError:
+            return caches['default']
+
+
+def mark_stale(context):
+    # Страницу с устаревшим фрагментом нельзя подтверждать ETag
+    # и сохранять в кэш страниц целиком.
+    request = getattr(context, 'request', None)
+    if request is not None:
+        request.stale_content = True
+
+
+@register.tag('cache')
+def do_cache(parser, token):
+    """Тег {% cache %} с однократным пересчётом и отдачей старой копии.
+
+    Синтаксис совпадает со встроенным тегом; version=... задаёт версию
+    данных, при смене которой фрагмент пересчитывается, а не ищется
+    под новым ключом, так что старая копия остаётся доступной:
+
+        {% load stampede_cache %}
+        {% cache 500 sidebar request.user.pk version=feed_version %}
+    """
+    nodelist = parser.parse(('endcache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments.")
+    options = {}
+    while len(tokens) > 3 and tokens[-1].startswith(('using=', 'version=')):
+        name, value = tokens.pop().split('=', 1)
+        options[name] = parser.compile_filter(value)
+    return StampedeCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]],
+        options.get('using'),
+        options.get('version'),
+    )
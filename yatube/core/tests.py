@@ -1,6 +1,35 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
 from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
-from django.test import Client, TestCase
+from django.core.cache import cache, caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.utils import make_template_fragment_key
+from django.core.management import call_command
+from django.db import connection
+from django.template import Context, Template
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from django.urls import reverse
+
+from core import benchmark
+from core import cache as stampede
+from core import db, metrics
+from core.checks import check_shared_cache
+from core.middleware import PIN_COOKIE
+from core.routers import ReplicaRouter
+from core.sqlite_cache import SQLiteCache
+from core.templatetags import stampede_cache
+from posts import middleware as page_cache
+from posts.models import FeedEntry, Post, User
+from yatube.caches import parse_cache_url
+from yatube import settings as production
+from yatube.databases import SQLITE_PRAGMAS, parse_database_url
 
 
 class ViewTestClass(TestCase):
@@ -25,3 +54,463 @@ class ViewTestClass(TestCase):
             with self.subTest(address=address):
                 response = self.guest_client.get(address)
                 self.assertTemplateUsed(response, template)
+
+
+class CacheConfigTests(SimpleTestCase):
+    def test_cache_urls(self):
+        """CACHE_URL разбирается в настройки нужного бэкенда."""
+        urls = {
+            'redis://cache:6379/1': (
+                'django_redis.cache.RedisCache', 'redis://cache:6379/1'),
+            'memcached://a:11211,b:11211': (
+                'django.core.cache.backends.memcached.PyLibMCCache',
+                ['a:11211', 'b:11211']),
+            'sqlite:////tmp/yatube.sqlite3': (
+                'core.sqlite_cache.SQLiteCache', '/tmp/yatube.sqlite3'),
+            'file:///tmp/yatube?max_entries=10': (
+                'django.core.cache.backends.filebased.FileBasedCache',
+                '/tmp/yatube'),
+            'db://yatube_cache': (
+                'django.core.cache.backends.db.DatabaseCache', 'yatube_cache'),
+        }
+        for url, (backend, location) in urls.items():
+            with self.subTest(url=url):
+                config = parse_cache_url(url, key_prefix='prod')
+                self.assertEqual(config['BACKEND'], backend)
+                self.assertEqual(config['LOCATION'], location)
+                self.assertEqual(config['KEY_PREFIX'], 'prod')
+        config = parse_cache_url('redis://cache:6379/1', max_connections=5)
+        self.assertEqual(
+            config['OPTIONS']['CONNECTION_POOL_KWARGS']['max_connections'], 5)
+        config = parse_cache_url('file:///tmp/yatube?max_entries=10')
+        self.assertEqual(config['OPTIONS'], {'MAX_ENTRIES': 10})
+        with self.assertRaises(ValueError):
+            parse_cache_url('ftp://cache')
+
+    def test_shared_cache_by_default(self):
+        """Без CACHE_URL кэш в общем файле SQLite, тесты — в памяти."""
+        self.assertEqual(
+            production.CACHES['default']['BACKEND'],
+            'core.sqlite_cache.SQLiteCache',
+        )
+        with self.settings(CACHES=production.CACHES):
+            self.assertEqual(check_shared_cache(None), [])
+        self.assertEqual(
+            caches['default'].__class__.__name__, 'LocMemCache')
+        self.assertEqual(
+            [warning.id for warning in check_shared_cache(None)],
+            ['core.W001'],
+        )
+
+    def test_file_cache_shared_between_workers(self):
+        """Файловый кэш виден всем процессам хоста под своим префиксом."""
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        config = parse_cache_url(f'file://{location}', key_prefix='prod')
+        params = {**config, 'OPTIONS': config.get('OPTIONS', {})}
+        first = FileBasedCache(location, params)
+        second = FileBasedCache(location, params)
+        other = FileBasedCache(location, {**params, 'KEY_PREFIX': 'stage'})
+        first.set('feed', 'value')
+        self.assertEqual(second.get('feed'), 'value')
+        self.assertIsNone(other.get('feed'))
+
+
+def hit(location, key, attempts, results):
+    cache = SQLiteCache(location, {})
+    for _ in range(attempts):
+        cache.incr(key)
+    results.put(cache.add('lock', os.getpid(), 30))
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.location = os.path.join(directory, 'cache.sqlite3')
+
+    def test_shared_between_processes(self):
+        """Процессы видят записи друг друга, add() и incr() атомарны."""
+        cache = SQLiteCache(self.location, {})
+        cache.set('hits', 0, None)
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        workers = [
+            context.Process(
+                target=hit, args=(self.location, 'hits', 50, results))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        added = [results.get(timeout=30) for _ in workers]
+        for worker in workers:
+            worker.join()
+            self.assertEqual(worker.exitcode, 0)
+        self.assertEqual(cache.get('hits'), 200)
+        self.assertEqual(added.count(True), 1)
+        self.assertIn(
+            cache.get('lock'), [worker.pid for worker in workers])
+
+    def test_version_bumped_in_other_process(self):
+        """Новая версия ленты из одного воркера видна другому."""
+        first = SQLiteCache(self.location, {})
+        second = SQLiteCache(self.location, {})
+        first.set('feed-version:index', 'a', None)
+        self.assertEqual(second.get('feed-version:index'), 'a')
+        context = multiprocessing.get_context('fork')
+        worker = context.Process(
+            target=first.set_many, args=({'feed-version:index': 'b'}, None))
+        worker.start()
+        worker.join()
+        self.assertEqual(second.get_many(['feed-version:index']), {
+            'feed-version:index': 'b'})
+
+    def test_expiry_and_culling(self):
+        """Чистка удаляет записи со сроком жизни, но не вечные версии."""
+        cache = SQLiteCache(
+            self.location, {'OPTIONS': {'MAX_ENTRIES': 10}})
+        cache.set('version', 'v', None)
+        cache.set('expired', 1, -1)
+        self.assertIsNone(cache.get('expired'))
+        self.assertTrue(cache.add('expired', 2))
+        self.assertFalse(cache.add('expired', 3))
+        self.assertEqual(cache.get('expired'), 2)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        with mock.patch('core.sqlite_cache.CULL_INTERVAL', 1):
+            for number in range(30):
+                cache.set(f'fragment:{number}', number, 60)
+        self.assertEqual(cache.get('version'), 'v')
+        self.assertLessEqual(
+            len(cache.get_many(f'fragment:{n}' for n in range(30))), 10)
+        cache.delete_many(['version'])
+        self.assertIsNone(cache.get('version'))
+
+
+class StampedeCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.clear()
+        self.compute = mock.Mock(return_value='new')
+
+    def get(self, **kwargs):
+        return stampede.get_or_compute(
+            'key', self.compute, 60, cache=self.cache, **kwargs)
+
+    def test_value_computed_once(self):
+        """Значение считается один раз и дальше берётся из кэша."""
+        self.assertEqual(self.get(), 'new')
+        self.assertEqual(self.get(), 'new')
+        self.compute.assert_called_once()
+
+    def test_stale_served_while_locked(self):
+        """Пока другой процесс пересчитывает, отдаётся старая копия."""
+        self.cache.set('key', ('old', 1, None))
+        self.cache.add('key:lock', 1)
+        on_stale = mock.Mock()
+        self.assertEqual(self.get(version=2, on_stale=on_stale), 'old')
+        self.compute.assert_not_called()
+        on_stale.assert_called_once()
+        self.cache.delete('key:lock')
+        self.assertEqual(self.get(version=2), 'new')
+        self.assertIsNone(self.cache.get('key:lock'))
+
+    def test_expired_entry_recomputed(self):
+        """Истёкшая запись пересчитывается, а TTL сдвигается случайно."""
+        started = time.time()
+        self.get()
+        _, _, fresh_until = self.cache.get('key')
+        self.assertGreaterEqual(fresh_until, started + 60 * 0.9)
+        self.assertLessEqual(fresh_until, time.time() + 60)
+        self.cache.set('key', ('old', None, started - 1))
+        self.assertEqual(self.get(), 'new')
+        self.assertEqual(self.compute.call_count, 2)
+
+    @mock.patch('core.cache.LOCK_WAIT', 0.1)
+    def test_cold_miss_waits_for_lock(self):
+        """Без старой копии процесс ждёт пересчёта, а затем считает сам."""
+        self.cache.add('key:lock', 1)
+        self.assertEqual(self.get(), 'new')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_template_tag(self):
+        """Тег пересчитывает фрагмент при смене версии."""
+        template = Template(
+            '{% load stampede_cache %}'
+            '{% cache 60 fragment page version=version %}'
+            '{{ text }}{% endcache %}'
+        )
+        request = RequestFactory().get('/')
+
+        def render(text, version):
+            context = Context({'page': 1, 'text': text, 'version': version})
+            context.request = request
+            return template.render(context)
+
+        self.assertEqual(render('first', 1), 'first')
+        self.assertEqual(render('second', 1), 'first')
+        self.assertEqual(render('second', 2), 'second')
+        key = make_template_fragment_key('fragment', [1])
+        self.cache.add(f'{key}:lock', 1)
+        self.assertEqual(render('third', 3), 'second')
+        self.assertTrue(request.stale_content)
+
+
+class DatabaseConfigTests(TestCase):
+    def test_postgres_url(self):
+        """DATABASE_URL для PostgreSQL задаёт постоянные соединения."""
+        config = parse_database_url(
+            'postgres://user:p%40ss@db:6432/yatube?pooler=1&sslmode=require')
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(
+            (config['NAME'], config['USER'], config['PASSWORD']),
+            ('yatube', 'user', 'p@ss'))
+        self.assertEqual((config['HOST'], config['PORT']), ('db', 6432))
+        self.assertEqual(config['CONN_MAX_AGE'], 600)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertTrue(config['DISABLE_SERVER_SIDE_CURSORS'])
+        self.assertEqual(config['OPTIONS']['sslmode'], 'require')
+        config = parse_database_url('postgres://db/yatube?conn_max_age=0')
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+        self.assertFalse(config['DISABLE_SERVER_SIDE_CURSORS'])
+
+    def test_sqlite_url(self):
+        """Для SQLite включаются WAL и настройки PRAGMA."""
+        config = parse_database_url('sqlite:////srv/yatube/db.sqlite3')
+        self.assertEqual(config['NAME'], '/srv/yatube/db.sqlite3')
+        self.assertEqual(config['PRAGMAS'], SQLITE_PRAGMAS)
+        with self.assertRaises(ValueError):
+            parse_database_url('mysql://db/yatube')
+
+    def test_pragmas_applied(self):
+        """PRAGMA выполняются для каждого соединения с SQLite."""
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(
+                cursor.fetchone()[0], SQLITE_PRAGMAS['cache_size'])
+
+    def test_unusable_connection_closed(self):
+        """Оборвавшееся постоянное соединение закрывается."""
+        connection.ensure_connection()
+        settings_dict = {**connection.settings_dict,
+                         'CONN_HEALTH_CHECKS': True}
+        with mock.patch.object(connection, 'settings_dict', settings_dict), \
+                mock.patch.object(connection, 'is_usable',
+                                  return_value=False), \
+                mock.patch.object(connection, 'close') as close:
+            db.check_connections()
+        close.assert_called_once()
+
+
+def uncached(key, compute, *args, **kwargs):
+    return compute()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpTestData(cls):
+        # Реплика в тестах не получает изменений, то есть «отстаёт» всегда.
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Основная')
+
+    def setUp(self):
+        # Страница ленты читается при отрисовке фрагмента, а не во вьюхе.
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_feed_reads_from_replica(self):
+        """Ленты читаются с реплики, записи уходят на основную базу."""
+        with mock.patch.object(
+                stampede_cache, 'get_or_compute', side_effect=uncached):
+            response = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertEqual(response.context['user'], self.user)
+        response = self.authorized_client.get(
+            reverse('posts:post_edit', args=[self.post.id]))
+        self.assertEqual(response.context['post_id'], self.post.id)
+
+    def test_user_pinned_after_write(self):
+        """После своей записи пользователь читает с основной базы."""
+        response = self.authorized_client.post(
+            reverse('posts:add_comment', args=[self.post.id]),
+            {'text': 'Комментарий'},
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=[self.post.id]))
+        self.assertEqual(response.context['post'], self.post)
+        self.assertEqual(len(response.context['comments']), 1)
+        with mock.patch.object(
+                stampede_cache, 'get_or_compute', side_effect=uncached):
+            response = self.guest_client.get(reverse('posts:index'))
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    @override_settings(PAGE_CACHE_ENABLED=True)
+    def test_cache_filled_from_primary(self):
+        """Кэш не заполняется данными отстающей реплики.
+
+        Фрагмент пересчитывается с основной базы, а страница, что-то
+        прочитавшая с реплики, в кэш страниц не попадает.
+        """
+        url = reverse('posts:index')
+        with mock.patch.object(
+                stampede_cache, 'get_or_compute', side_effect=uncached):
+            self.assertNotContains(self.guest_client.get(url), self.post.text)
+        for _ in range(2):
+            self.assertContains(self.guest_client.get(url), self.post.text)
+        self.assertEqual(page_cache.stats(), {'hits': 1, 'misses': 2})
+
+    def test_router_outside_requests(self):
+        """Вне помеченных вьюх чтение идёт с основной базы."""
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Post))
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+        replica_post = Post(pk=self.post.pk)
+        replica_post._state.db = 'replica'
+        self.assertEqual(
+            router.db_for_write(Post, instance=replica_post), 'default')
+        self.assertTrue(router.allow_relation(replica_post, self.post))
+
+
+class BenchmarkTests(TransactionTestCase):
+    def test_every_route_has_scenario(self):
+        """Каждый маршрут posts, users и about есть в нагрузочном прогоне."""
+        self.assertEqual(benchmark.missing_routes(), [])
+        scenarios = [
+            scenario for scenario in benchmark.SCENARIOS
+            if scenario.name != 'about:tech'
+        ]
+        self.assertEqual(benchmark.missing_routes(scenarios), ['about:tech'])
+
+    def test_run_on_seeded_data(self):
+        """Прогон по засеянной базе обходит все маршруты без ошибок."""
+        call_command(
+            'seed_benchmark', users=20, groups=2, posts=100, follows=60,
+            comments=50, stdout=StringIO(),
+        )
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertEqual(
+            FeedEntry.objects.count(),
+            Post.objects.filter(author__following__isnull=False).count(),
+        )
+        duration, samples = benchmark.run(
+            len(benchmark.SCENARIOS), concurrency=2, seed=1)
+        report = benchmark.summarize(duration, samples)
+        self.assertEqual(set(report['routes']), benchmark.route_names())
+        for name, row in report['routes'].items():
+            self.assertEqual(row['errors'], 0, name)
+
+    def test_view_error_counted(self):
+        """Исключение во вьюхе пишется в лог и считается ошибкой."""
+        call_command(
+            'seed_benchmark', users=5, groups=1, posts=10, follows=5,
+            comments=0, stdout=StringIO(),
+        )
+        scenarios = [
+            scenario for scenario in benchmark.SCENARIOS
+            if scenario.name in ('posts:search', 'about:tech')
+        ]
+        with mock.patch('posts.views.get_backend', side_effect=RuntimeError):
+            with self.assertLogs('core.benchmark', 'ERROR') as logs:
+                duration, samples = benchmark.run(
+                    4, concurrency=2, seed=1, scenarios=scenarios)
+        report = benchmark.summarize(duration, samples)
+        self.assertEqual(report['requests'], 4)
+        self.assertEqual(report['routes']['posts:search']['errors'], 2)
+        self.assertEqual(report['routes']['about:tech']['errors'], 0)
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('RuntimeError', logs.output[0])
+
+    def test_compare_with_baseline(self):
+        baseline = {
+            'throughput': 100,
+            'routes': {'posts:index': {'p95_ms': 10, 'queries': 2}},
+        }
+        report = {
+            'throughput': 90,
+            'routes': {'posts:index': {'p95_ms': 12, 'queries': 3}},
+        }
+        self.assertEqual(benchmark.compare(report, baseline, 0.25), [])
+        report = {
+            'throughput': 50,
+            'routes': {'posts:index': {'p95_ms': 20, 'queries': 12}},
+        }
+        self.assertEqual(len(benchmark.compare(report, baseline, 0.25)), 3)
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+        self.guest_client = Client()
+
+    def counters(self, view):
+        return metrics.registry.counters[view]
+
+    def test_view_metrics_recorded(self):
+        """Запросы, SQL, шаблоны, кэш и размер считаются по вьюхам."""
+        self.guest_client.get(reverse('posts:index'))
+        response = self.guest_client.get(reverse('posts:index'))
+        counters = self.counters('posts:index')
+        self.assertEqual(counters['requests'], 2)
+        self.assertGreater(counters['db_queries'], 0)
+        self.assertGreater(counters['db_seconds'], 0)
+        self.assertGreater(counters['template_seconds'], 0)
+        self.assertGreater(counters['cache_misses'], 0)
+        self.assertGreater(counters['cache_hits'], 0)
+        self.assertGreaterEqual(
+            counters['response_bytes'], len(response.content) * 2)
+
+    def test_metrics_closed_by_default(self):
+        """Без токена и списка адресов метрики не отдаются никому."""
+        response = self.guest_client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_metrics_endpoint(self):
+        """Метрики отдаются в формате Prometheus разрешённым адресам."""
+        self.guest_client.get(
+            reverse('posts:post_detail', args=[self.post.id]))
+        response = self.guest_client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        body = response.content.decode()
+        self.assertIn(
+            'yatube_requests_total{view="posts:post_detail"} 1', body)
+        self.assertIn(
+            'yatube_request_duration_seconds_count'
+            '{view="posts:post_detail"} 1', body)
+        response = self.guest_client.get(
+            reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        """За прокси метрики отдаются по токену из заголовка."""
+        for header, status in (
+            ('Bearer secret', HTTPStatus.OK),
+            ('Bearer wrong', HTTPStatus.NOT_FOUND),
+            ('secret', HTTPStatus.NOT_FOUND),
+        ):
+            with self.subTest(header=header):
+                response = self.guest_client.get(
+                    reverse('metrics'), REMOTE_ADDR='10.0.0.1',
+                    HTTP_AUTHORIZATION=header)
+                self.assertEqual(response.status_code, status)
+
+    @override_settings(SLOW_REQUEST_SECONDS=0)
+    def test_slow_request_logged(self):
+        with self.assertLogs('yatube.slow_requests', 'WARNING') as logs:
+            self.guest_client.get(reverse('posts:profile', args=['auth']))
+        self.assertIn('posts:profile', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
@@ -1,4 +1,9 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
+
+from . import metrics as request_metrics
 
 
 def page_not_found(request, exception):
@@ -15,3 +20,22 @@ def permission_denied(request):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    """Метрики процесса для Prometheus: с разрешённых адресов или по токену."""
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        request_metrics.registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def metrics_allowed(request):
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    keyword, _, token = request.META.get(
+        'HTTP_AUTHORIZATION', '').partition(' ')
+    return bool(settings.METRICS_TOKEN) and keyword == 'Bearer' and (
+        constant_time_compare(token, settings.METRICS_TOKEN))
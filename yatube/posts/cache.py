@@ -0,0 +1,130 @@
+import time
+from datetime import datetime, timezone
+from itertools import chain
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow, Group, User
+
+VERSION_PREFIX: str = 'feed-version'
+VERSION_BATCH_SIZE: int = 1000
+
+
+def version_key(feed, pk=None):
+    return f'{VERSION_PREFIX}:{feed}' if pk is None else (
+        f'{VERSION_PREFIX}:{feed}:{pk}')
+
+
+def get_version(feed, pk=None):
+    """Текущая версия ленты; входит в ключи кэшированных фрагментов."""
+    return cache.get_or_set(version_key(feed, pk), new_version, None)
+
+
+def get_versions(keys):
+    """Версии по ключам version_key за одно обращение к кэшу."""
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = cache.get_or_set(key, new_version, None)
+    return [versions[key] for key in keys]
+
+
+def bump(keys):
+    """Выдаёт новые версии лентам, делая их фрагменты недостижимыми.
+
+    Версии меняются после коммита транзакции: иначе запрос, пришедший
+    до него, закэшировал бы старые строки уже под новой версией. После
+    коммита о них узнают и слушатели живых обновлений.
+    """
+    version = new_version()
+    batch = {}
+    for key in keys:
+        batch[key] = version
+        if len(batch) == VERSION_BATCH_SIZE:
+            store(batch)
+            batch = {}
+    if batch:
+        store(batch)
+
+
+def store(versions):
+    from .live import publish
+    transaction.on_commit(lambda: cache.set_many(versions, None))
+    publish(versions)
+
+
+def reset(keys):
+    """Сбрасывает версии, удаляя их ключи.
+
+    Новая версия выдаётся при первом чтении, поэтому массовый сброс
+    не заполняет кэш ключами пользователей, которые давно не заходили,
+    и не вытесняет из него остальные записи.
+    """
+    batch = []
+    for key in keys:
+        batch.append(key)
+        if len(batch) == VERSION_BATCH_SIZE:
+            cache.delete_many(batch)
+            batch = []
+    if batch:
+        cache.delete_many(batch)
+
+
+def bump_post(post, *group_ids):
+    """Новые версии лент с постом, кроме лент подписчиков автора.
+
+    Подписчиков могут быть сотни тысяч, поэтому их ленты обновляет
+    задача очереди, см. feed.refresh.
+    """
+    keys = [
+        version_key('index'),
+        version_key('post', post.pk),
+        version_key('profile', post.author_id),
+    ]
+    keys.extend(
+        version_key('group', group_id)
+        for group_id in {post.group_id, *group_ids} if group_id
+    )
+    bump(keys)
+
+
+def bump_all():
+    """Новые версии главной, групп и профилей после записи в обход сигналов.
+
+    Страницы постов зависят от версий профиля и группы, а ленты подписок
+    сбрасывает feed.rebuild_all.
+    """
+    groups = Group.objects.values_list('pk', flat=True)
+    users = User.objects.values_list('pk', flat=True)
+    bump(chain(
+        [version_key('index')],
+        (version_key('group', pk) for pk in groups.iterator()),
+        (version_key('profile', pk) for pk in users.iterator()),
+    ))
+
+
+def follower_keys(author_id):
+    """Ключи лент подписок, в которых показываются посты автора."""
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    for user_id in followers.iterator():
+        yield version_key('follow', user_id)
+
+
+def new_version():
+    """Версия начинается с момента выдачи: из неё берётся Last-Modified."""
+    return f'{int(time.time() * 1000):x}.{uuid4().hex}'
+
+
+def version_time(version):
+    stamp, dot, _ = str(version).partition('.')
+    if not dot:
+        return None
+    try:
+        milliseconds = int(stamp, 16)
+    except ValueError:
+        return None
+    return datetime.fromtimestamp(milliseconds / 1000, timezone.utc)
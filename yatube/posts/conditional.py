@@ -0,0 +1,121 @@
+import hashlib
+from functools import wraps
+
+from django.middleware.csrf import get_token
+from django.views.decorators.http import condition
+
+from .cache import get_versions, version_key, version_time
+from .models import Group, Post, User
+
+
+def conditional(tags, forms=False):
+    """ETag и Last-Modified страницы по версиям её лент.
+
+    tags(request, **kwargs) возвращает ключи версий, от которых зависит
+    страница, или None, если объекта нет и ответит сама вьюха. Ответ
+    304 отдаётся до выборки постов и рендеринга шаблонов. Теги и их
+    версии остаются в request.page_tags и request.page_versions.
+    Авторизованным в теги добавляется версия уведомлений: от неё
+    зависит счётчик в шапке. Страницы с формами (forms=True) содержат
+    CSRF-токен, который меняется при входе, поэтому он входит в ETag.
+    """
+    def get_page_versions(request, *args, **kwargs):
+        if not hasattr(request, 'page_versions'):
+            request.page_tags = with_header_tags(
+                request, tags(request, *args, **kwargs))
+            request.page_versions = request.page_tags and get_versions(
+                request.page_tags)
+        return request.page_versions
+
+    def etag(request, *args, **kwargs):
+        page_versions = get_page_versions(request, *args, **kwargs)
+        if page_versions is None:
+            return None
+        source = '|'.join([
+            *page_versions,
+            str(request.user.pk or ''),
+            request.get_full_path(),
+            form_token(request) if forms else '',
+        ])
+        return hashlib.md5(source.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        page_versions = get_page_versions(request, *args, **kwargs)
+        if page_versions is None or request.user.is_authenticated:
+            # Шапка страницы зависит от пользователя, а вход и выход
+            # версий не меняют: авторизованным хватает ETag.
+            return None
+        times = [version_time(version) for version in page_versions]
+        return None if None in times else max(times)
+
+    def decorator(view):
+        conditional_view = condition(
+            etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if getattr(request, 'stale_content', False):
+                # Часть страницы взята из устаревшего фрагмента кэша.
+                del response['ETag']
+                del response['Last-Modified']
+            return response
+        return wrapper
+    return decorator
+
+
+def form_token(request):
+    """Секрет CSRF, от которого зависят формы для авторизованных.
+
+    Сам get_token() каждый раз маскирует секрет по-новому, а анонимам
+    формы не показываются: кука для них сломала бы кэш страниц.
+    """
+    if not request.user.is_authenticated:
+        return ''
+    get_token(request)
+    return request.META['CSRF_COOKIE']
+
+
+def with_header_tags(request, tags):
+    if tags is None or not request.user.is_authenticated:
+        return tags
+    return [*tags, version_key('notifications', request.user.pk)]
+
+
+def viewer_tags(request):
+    if request.user.is_authenticated:
+        return [version_key('follow', request.user.pk)]
+    return []
+
+
+def index_tags(request):
+    return [version_key('index')]
+
+
+def group_tags(request, slug):
+    group_id = Group.objects.filter(
+        slug=slug).values_list('pk', flat=True).first()
+    return group_id and [version_key('group', group_id)]
+
+
+def profile_tags(request, username):
+    user_id = User.objects.filter(
+        username=username).values_list('pk', flat=True).first()
+    return user_id and [
+        version_key('profile', user_id),
+        *viewer_tags(request),
+    ]
+
+
+def post_tags(request, post_id):
+    post = Post.objects.filter(
+        pk=post_id).values('author_id', 'group_id').first()
+    if post is None:
+        return None
+    tags = [
+        version_key('post', post_id),
+        version_key('profile', post['author_id']),
+    ]
+    if post['group_id']:
+        tags.append(version_key('group', post['group_id']))
+    return tags
@@ -0,0 +1,64 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def adjust_user(user_id, **deltas):
+    """Атомарно сдвигает счётчики пользователя.
+
+    Недостающая строка создаётся только при увеличении счётчиков: при
+    каскадном удалении пользователя её нельзя восстанавливать.
+    """
+    changes = {field: shift(field, delta) for field, delta in deltas.items()}
+    updated = UserStats.objects.filter(user_id=user_id).update(**changes)
+    if not updated and min(deltas.values()) > 0:
+        UserStats.objects.get_or_create(user_id=user_id)
+        UserStats.objects.filter(user_id=user_id).update(**changes)
+
+
+def adjust_group(group_id, delta):
+    if group_id:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=shift('posts_count', delta))
+
+
+def adjust_post(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=shift('comments_count', delta))
+
+
+def shift(field, delta):
+    """Сдвиг счётчика, который не уходит ниже нуля.
+
+    Разошедшийся с данными счётчик может уже быть нулём, а
+    отрицательное значение в PositiveIntegerField нарушает ограничение.
+    """
+    return Greatest(F(field) + delta, 0)
+
+
+def count_of(queryset, field):
+    """Подзапрос с числом строк queryset, сгруппированных по field."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def recount():
+    """Пересчитывает все денормализованные счётчики по исходным таблицам."""
+    UserStats.objects.bulk_create(
+        [
+            UserStats(user_id=user_id)
+            for user_id in User.objects.filter(
+                stats__isnull=True).values_list('pk', flat=True)
+        ],
+        ignore_conflicts=True,
+    )
+    UserStats.objects.update(
+        posts_count=count_of(Post.objects, 'author'),
+        followers_count=count_of(Follow.objects, 'author'),
+        following_count=count_of(Follow.objects, 'user'),
+    )
+    Group.objects.update(posts_count=count_of(Post.objects, 'group'))
+    Post.objects.update(comments_count=count_of(Comment.objects, 'post'))
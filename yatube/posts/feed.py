@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.db import connection, transaction
+
+from .cache import bump, follower_keys, version_key
+from .models import FeedEntry, Follow, Post
+
+FEED_BATCH_SIZE: int = 1000
+
+
+def schedule(post):
+    """Заказывает раскладку нового поста, не задерживая запрос.
+
+    У автора могут быть сотни тысяч подписчиков: строки их лент и новые
+    версии лент пишет задача очереди.
+    """
+    if not settings.FEED_ASYNC:
+        return deliver(post.pk)
+    from .tasks import deliver_post as task
+    return task.delay(post.pk)
+
+
+def deliver(post_id):
+    post = Post.objects.filter(pk=post_id).only(
+        'author_id', 'pub_date').first()
+    if post is None:
+        return
+    fan_out(post)
+    bump_followers(post.author_id)
+
+
+def refresh(author_id):
+    """Заказывает новые версии лент подписчиков после правки автора.
+
+    Пока задача автора ждёт в очереди, вторая не ставится: она и так
+    выдаст версии после всех правок.
+    """
+    if not settings.FEED_ASYNC:
+        return bump_followers(author_id)
+    from .tasks import bump_followers as task
+    return task.enqueue((author_id,), key=str(author_id))
+
+
+def bump_followers(author_id):
+    bump(follower_keys(author_id))
+
+
+def fan_out(post):
+    """Раскладывает новый пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    write_entries(
+        FeedEntry(
+            user_id=user_id,
+            post=post,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def subscribe(user_id, author_id):
+    """Добавляет в ленту подписчика все посты нового автора."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')
+    write_entries(
+        FeedEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def unsubscribe(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+@transaction.atomic
+def rebuild(user_id):
+    FeedEntry.objects.filter(user_id=user_id).delete()
+    authors = Follow.objects.filter(
+        user_id=user_id
+    ).values_list('author_id', flat=True)
+    for author_id in authors:
+        subscribe(user_id, author_id)
+    bump([version_key('follow', user_id)])
+
+
+@transaction.atomic
+def rebuild_all():
+    """Перестраивает все ленты одним INSERT ... SELECT на стороне базы.
+
+    Сигналы при этом не срабатывают, поэтому версии лент всех прежних
+    и нынешних подписчиков сбрасываются здесь.
+    """
+    users = set(FeedEntry.objects.order_by().values_list(
+        'user_id', flat=True).distinct())
+    FeedEntry.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {FeedEntry._meta.db_table} '
+            f'(user_id, post_id, author_id, pub_date) '
+            f'SELECT follow.user_id, post.id, post.author_id, post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'JOIN {Post._meta.db_table} post '
+            f'ON post.author_id = follow.author_id'
+        )
+    users.update(Follow.objects.order_by().values_list(
+        'user_id', flat=True).distinct())
+    bump(version_key('follow', user_id) for user_id in users)
+
+
+def write_entries(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == FEED_BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
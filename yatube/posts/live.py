@@ -0,0 +1,202 @@
+"""Живые обновления лент: «N новых записей» без перезагрузки страницы.
+
+Каналы брокера — ключи версий главной, групп и лент подписок из
+posts.cache: bump() публикует в них после коммита транзакции.
+LocalBroker будит ожидающих только в своём процессе. CacheBroker
+вдобавок раз в LIVE_POLL_SECONDS сверяет версии в кэше и так узнаёт
+о постах, созданных воркерами и соседними процессами сервера. Брокер
+выбирается настройкой LIVE_BROKER.
+
+Каждое соединение держит поток WSGI-сервера и соединение с базой до
+LIVE_STREAM_SECONDS, поэтому всё это включается настройкой
+LIVE_UPDATES_ENABLED.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from .cache import get_versions, version_key
+from .models import FeedEntry, Post
+
+
+class LocalBroker:
+    """Публикации внутри процесса.
+
+    Состояние каналов — счётчики публикаций; wait() возвращает новое
+    состояние, как только оно отличается от переданного, или по таймауту.
+    Счётчики есть только у каналов, которые слушают внутри listen().
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.published = {}
+        self.listeners = Counter()
+
+    @contextmanager
+    def listen(self, channels):
+        with self.condition:
+            self.listeners.update(channels)
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.listeners.subtract(channels)
+                for channel in channels:
+                    if self.listeners[channel] <= 0:
+                        del self.listeners[channel]
+                        self.published.pop(channel, None)
+
+    def publish(self, channels):
+        with self.condition:
+            channels = [
+                channel for channel in channels if channel in self.listeners]
+            if not channels:
+                return
+            for channel in channels:
+                self.published[channel] = self.published.get(channel, 0) + 1
+            self.condition.notify_all()
+
+    def state(self, channels):
+        with self.condition:
+            return self.local_state(channels)
+
+    def local_state(self, channels):
+        return tuple(self.published.get(channel, 0) for channel in channels)
+
+    def wait(self, channels, state, timeout):
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.local_state(channels) != state, timeout)
+            return self.local_state(channels)
+
+
+class CacheBroker(LocalBroker):
+    """Замечает и публикации других процессов по версиям лент в кэше."""
+
+    def state(self, channels):
+        return super().state(channels), tuple(get_versions(channels))
+
+    def wait(self, channels, state, timeout):
+        local, versions = state
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            local = super().wait(
+                channels, local,
+                max(min(remaining, settings.LIVE_POLL_SECONDS), 0))
+            current = local, tuple(get_versions(channels))
+            if current != state or remaining <= 0:
+                return current
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.LIVE_BROKER)()
+
+
+def publish(keys):
+    """Сообщает слушателям о смене версий лент после коммита транзакции."""
+    if not settings.LIVE_UPDATES_ENABLED:
+        return
+    keys = [key for key in keys if is_live(key)]
+    if keys:
+        transaction.on_commit(lambda: get_broker().publish(keys))
+
+
+def is_live(key):
+    """Есть ли у ключа версии лента с живыми обновлениями."""
+    return key == version_key('index') or key.startswith(
+        (version_key('group', ''), version_key('follow', '')))
+
+
+class LiveFeed:
+    """Лента, в которой считаются посты новее последнего показанного."""
+
+    def __init__(self, channel, posts):
+        self.channels = [channel]
+        self.posts = posts
+
+    def count_new(self, since):
+        return self.posts.filter(pk__gt=since).count()
+
+    def latest(self):
+        return self.posts.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+
+
+class FollowFeed(LiveFeed):
+    def __init__(self, user_id):
+        super().__init__(
+            version_key('follow', user_id),
+            FeedEntry.objects.filter(user_id=user_id))
+
+    def count_new(self, since):
+        return self.posts.filter(post_id__gt=since).count()
+
+    def latest(self):
+        return self.posts.order_by('-post_id').values_list(
+            'post_id', flat=True).first() or 0
+
+
+def index_feed():
+    return LiveFeed(version_key('index'), Post.objects.all())
+
+
+def group_feed(group_id):
+    return LiveFeed(
+        version_key('group', group_id), Post.objects.filter(group_id=group_id))
+
+
+def poll(feed, since, timeout):
+    """Ждёт до timeout секунд новых постов и возвращает их число."""
+    broker = get_broker()
+    with broker.listen(feed.channels):
+        state = broker.state(feed.channels)
+        deadline = time.monotonic() + timeout
+        count = feed.count_new(since)
+        while not count:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            state = broker.wait(feed.channels, state, remaining)
+            count = feed.count_new(since)
+    return count
+
+
+def stream(feed, since):
+    """События server-sent events с числом новых постов.
+
+    Событие уходит при каждом изменении числа, между ними — комментарии
+    раз в LIVE_KEEPALIVE_SECONDS, чтобы прокси не закрывали соединение.
+    Через LIVE_STREAM_SECONDS поток заканчивается, и браузер
+    переподключается сам.
+    """
+    broker = get_broker()
+    with broker.listen(feed.channels):
+        state = broker.state(feed.channels)
+        deadline = time.monotonic() + settings.LIVE_STREAM_SECONDS
+        count = None
+        yield f'retry: {settings.LIVE_RETRY_MS}\n\n'
+        while True:
+            # Число пересчитывается и по таймауту: публикация могла
+            # опередить коммит в другом процессе.
+            current = feed.count_new(since)
+            if current != count:
+                count = current
+                yield (
+                    f'event: posts\ndata: {json.dumps({"count": count})}\n\n')
+            else:
+                yield ': keepalive\n\n'
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            state = broker.wait(
+                feed.channels, state,
+                min(remaining, settings.LIVE_KEEPALIVE_SECONDS))
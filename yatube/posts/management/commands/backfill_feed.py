@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed
+from posts.models import Follow
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает материализованные ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', action='append', type=int, dest='users',
+            help='id пользователя, чью ленту нужно перестроить',
+        )
+
+    def handle(self, *args, **options):
+        users = options['users']
+        if not users:
+            feed.rebuild_all()
+            rebuilt = Follow.objects.values('user_id').distinct().count()
+            self.stdout.write(
+                self.style.SUCCESS(f'Перестроено лент: {rebuilt}'))
+            return
+        rebuilt = 0
+        for user_id in users:
+            feed.rebuild(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(f'Перестроено лент: {rebuilt}'))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+PROGRESS_EVERY: int = 10000
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии или подписки в JSON Lines '
+        'или CSV, не загружая таблицу в память целиком'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=transfer.TABLES)
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='по умолчанию определяется по расширению файла',
+        )
+
+    def handle(self, *args, **options):
+        table = transfer.TABLES[options['table']]
+        total = 0
+        try:
+            format = options['format'] or transfer.guess_format(
+                options['path'])
+            with open(options['path'], 'w', encoding='utf-8',
+                      newline='') as file:
+                for total in transfer.write_rows(
+                        file, format, table.fields, table.export_rows()):
+                    if total % PROGRESS_EVERY == 0:
+                        self.stdout.write(f'Выгружено: {total}')
+        except (OSError, transfer.TransferError) as error:
+            raise CommandError(error)
+        self.stdout.write(
+            self.style.SUCCESS(f'Экспорт завершён, записей: {total}'))
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует группы, посты, комментарии или подписки из JSON Lines '
+        'или CSV пачками через bulk_create'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=transfer.TABLES)
+        parser.add_argument('path')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='по умолчанию определяется по расширению файла',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.BATCH_SIZE)
+        parser.add_argument(
+            '--create-users', action='store_true',
+            help='создавать отсутствующих авторов без пароля',
+        )
+        parser.add_argument(
+            '--skip-existing', action='store_true',
+            help='пропускать записи с уже занятыми ключами',
+        )
+
+    def handle(self, *args, **options):
+        table = transfer.TABLES[options['table']]
+        total = 0
+        try:
+            format = options['format'] or transfer.guess_format(
+                options['path'])
+            with open(options['path'], encoding='utf-8', newline='') as file:
+                with transaction.atomic():
+                    for total in transfer.import_rows(
+                            table,
+                            transfer.read_rows(file, format),
+                            options['batch_size'],
+                            options['create_users'],
+                            options['skip_existing']):
+                        self.stdout.write(f'Импортировано: {total}')
+        except (OSError, transfer.TransferError, IntegrityError) as error:
+            raise CommandError(error)
+        self.stdout.write('Счётчики, ленты и поиск')
+        transfer.finish_import()
+        self.stdout.write(
+            self.style.SUCCESS(f'Импорт завершён, записей: {total}'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts.middleware import stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша страниц для анонимов'
+
+    def handle(self, *args, **options):
+        result = stats()
+        total = result['hits'] + result['misses']
+        ratio = result['hits'] / total if total else 0
+        self.stdout.write(
+            f"Попаданий: {result['hits']}, промахов: {result['misses']}, "
+            f'доля попаданий: {ratio:.1%}'
+        )
@@ -0,0 +1,177 @@
+import random
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from mixer.backend.django import mixer
+
+from posts import cache, counters, feed, search
+from posts.models import Comment, Follow, Group, Post, User
+from posts.transfer import explicit_dates
+
+SCALES = {
+    'small': {
+        'users': 200, 'groups': 10, 'posts': 5_000,
+        'follows': 2_000, 'comments': 10_000,
+    },
+    'medium': {
+        'users': 5_000, 'groups': 50, 'posts': 200_000,
+        'follows': 50_000, 'comments': 400_000,
+    },
+    'large': {
+        'users': 50_000, 'groups': 200, 'posts': 2_000_000,
+        'follows': 300_000, 'comments': 4_000_000,
+    },
+}
+USERNAME: str = 'bench{0}'
+TEXTS_POOL: int = 500
+PERIOD = timedelta(days=730)
+
+
+def skewed(size, power=3):
+    """Индекс от 0 до size - 1, где малые значения выпадают чаще."""
+    return min(size - 1, int(size * random.random() ** power))
+
+
+def last_pk(model):
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True).first() or 0
+
+
+def created_pks(model, start):
+    """Ключи строк, добавленных bulk_create после start."""
+    return list(model.objects.filter(pk__gt=start).order_by(
+        'pk').values_list('pk', flat=True))
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу данными для нагрузочного тестирования: популярные '
+        'авторы получают больше постов и подписчиков, свежие посты — '
+        'больше комментариев'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small')
+        for name in SCALES['small']:
+            parser.add_argument(f'--{name}', type=int)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        sizes = {
+            name: options[name] if options[name] is not None else default
+            for name, default in SCALES[options['scale']].items()
+        }
+        self.batch_size = options['batch_size']
+        texts = [mixer.faker.text() for _ in range(TEXTS_POOL)]
+        users = self.create_users(sizes['users'])
+        groups = self.create_groups(sizes['groups'])
+        posts = self.create_posts(sizes['posts'], users, groups, texts)
+        self.create_follows(sizes['follows'], users)
+        self.create_comments(sizes['comments'], users, posts, texts)
+        self.stage('Счётчики, ленты и поиск')
+        with transaction.atomic():
+            counters.recount()
+        feed.rebuild_all()
+        backend = search.get_backend()
+        for batch in self.batches(
+                Post.objects.filter(pk__gte=posts[0]).only('id', 'text')
+                .iterator()):
+            backend.index_many(batch)
+        cache.bump_all()
+        self.stdout.write(self.style.SUCCESS('Данные созданы'))
+
+    def create_users(self, size):
+        self.stage(f'Пользователи: {size}')
+        start = last_pk(User)
+        with mixer.ctx(commit=False):
+            users = mixer.cycle(size).blend(
+                User,
+                username=(USERNAME.format(start + i) for i in range(size)),
+                is_active=True,
+                is_staff=False,
+                is_superuser=False,
+            )
+        for batch in self.batches(users):
+            User.objects.bulk_create(batch)
+        return created_pks(User, start)
+
+    def create_groups(self, size):
+        self.stage(f'Группы: {size}')
+        start = last_pk(Group)
+        with mixer.ctx(commit=False):
+            groups = mixer.cycle(size).blend(
+                Group,
+                slug=(f'bench-{start + i}' for i in range(size)),
+                title=(f'Сообщество {start + i}' for i in range(size)),
+            )
+        Group.objects.bulk_create(groups)
+        return created_pks(Group, start)
+
+    def create_posts(self, size, users, groups, texts):
+        self.stage(f'Посты: {size}')
+        start = last_pk(Post)
+        began = timezone.now() - PERIOD
+        step = PERIOD / max(size, 1)
+        posts = (
+            Post(
+                author_id=users[skewed(len(users), power=2)],
+                group_id=random.choice(groups) if random.random() < 0.7
+                else None,
+                text=' '.join(random.sample(texts, random.randint(1, 5))),
+                pub_date=began + step * i,
+            )
+            for i in range(size)
+        )
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            for batch in self.batches(posts):
+                Post.objects.bulk_create(batch)
+        return created_pks(Post, start)
+
+    def create_follows(self, size, users):
+        self.stage(f'Подписки: {size}')
+        size = min(size, len(users) * (len(users) - 1))
+        pairs = set()
+        while len(pairs) < size:
+            user = random.choice(users)
+            author = users[skewed(len(users))]
+            if user != author:
+                pairs.add((user, author))
+        follows = (
+            Follow(user_id=user, author_id=author) for user, author in pairs)
+        for batch in self.batches(follows):
+            Follow.objects.bulk_create(batch, ignore_conflicts=True)
+
+    def create_comments(self, size, users, posts, texts):
+        self.stage(f'Комментарии: {size}')
+        if not posts:
+            return
+        now = timezone.now()
+        comments = (
+            Comment(
+                post_id=posts[-1 - skewed(len(posts))],
+                author_id=random.choice(users),
+                text=random.choice(texts),
+                created=now - timedelta(minutes=random.randint(0, 10 ** 6)),
+            )
+            for _ in range(size)
+        )
+        with explicit_dates(Comment._meta.get_field('created')):
+            for batch in self.batches(comments):
+                Comment.objects.bulk_create(batch)
+
+    def batches(self, items):
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def stage(self, message):
+        self.stdout.write(message)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Ставит в очередь миниатюры для всех картинок постов'
+
+    def handle(self, *args, **options):
+        images = Post.objects.exclude(image='').values_list(
+            'image', flat=True).order_by('pk')
+        number = 0
+        for number, name in enumerate(images.iterator(), 1):
+            thumbnails.schedule_presets(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры заказаны для картинок: {number}; '
+            f'их создаст воркер run_worker'))
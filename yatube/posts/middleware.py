@@ -0,0 +1,125 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import parse_http_date_safe, urlencode
+
+from core import metrics
+
+from .cache import get_versions
+from .paginators import signed_cursor
+
+KEY_PREFIX: str = 'page-cache'
+HITS_KEY: str = f'{KEY_PREFIX}:hits'
+MISSES_KEY: str = f'{KEY_PREFIX}:misses'
+CACHED_PARAMS = frozenset(('page', 'cursor'))
+
+
+class AnonymousPageCacheMiddleware:
+    """Кэш страниц целиком для анонимных посетителей.
+
+    В кэш попадают ответы вьюх, объявивших теги через conditional().
+    Запись хранит ответ вместе с версиями тегов на момент рендеринга и
+    отдаётся, пока версии не изменились: сигналы моделей меняют их при
+    правке поста, автора или группы. Попадание в кэш не обращается к
+    базе данных и не проходит дальнейшие middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PAGE_CACHE_ENABLED or not is_cacheable(request):
+            return self.get_response(request)
+        params = page_params(request)
+        entry = cache.get(page_key(request.path, params))
+        if entry is not None and get_versions(
+                entry['tags']) == entry['versions']:
+            count(HITS_KEY)
+            metrics.record_cache(hit=True)
+            return conditional_response(request, entry['response'])
+        count(MISSES_KEY)
+        metrics.record_cache(hit=False)
+        response = self.get_response(request)
+        if should_store(request, response):
+            params = getattr(request, 'page_params', params)
+            cache.set(page_key(request.path, params), {
+                'tags': request.page_tags,
+                'versions': request.page_versions,
+                'response': response,
+            }, settings.PAGE_CACHE_TIMEOUT)
+        return response
+
+
+def is_cacheable(request):
+    # Без сессии посетитель заведомо анонимен, и проверять это
+    # по базе не нужно.
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and 'messages' not in request.COOKIES
+        and set(request.GET) <= CACHED_PARAMS
+    )
+
+
+def should_store(request, response):
+    return (
+        request.method == 'GET'
+        and response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not getattr(request, 'stale_content', False)
+        # Ответ с данными отстающей реплики остался бы под новыми
+        # версиями до конца PAGE_CACHE_TIMEOUT.
+        and not getattr(request, 'read_replica', False)
+        and getattr(request, 'page_versions', None)
+    )
+
+
+def page_params(request):
+    """Параметры страницы в том виде, в каком их поймёт вьюха.
+
+    Курсор без подписи сайта и нечисловой номер открывают первую
+    страницу, поэтому они не получают своих записей в кэше. Номер за
+    пределами ленты становится номером последней страницы уже во вьюхе,
+    см. views.get_paginator.
+    """
+    page = request.GET.get('page')
+    if page is not None:
+        try:
+            return {'page': int(page)}
+        except ValueError:
+            return {'page': 1}
+    cursor = signed_cursor(request.GET.get('cursor'))
+    return {'cursor': cursor} if cursor else {}
+
+
+def page_key(path, params):
+    source = f'{path}?{urlencode(sorted(params.items()))}'
+    return f'{KEY_PREFIX}:{hashlib.md5(source.encode()).hexdigest()}'
+
+
+def conditional_response(request, response):
+    return get_conditional_response(
+        request,
+        etag=response.get('ETag'),
+        last_modified=parse_http_date_safe(response.get('Last-Modified')),
+        response=response,
+    )
+
+
+def count(key):
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, 1, None)
+
+
+def stats():
+    values = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {
+        'hits': values.get(HITS_KEY, 0),
+        'misses': values.get(MISSES_KEY, 0),
+    }
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:07
+
+from django.db import migrations
+
+from posts.stemmer import stems
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_post_fts USING fts5('
+            "body, tokenize='unicode61 remove_diacritics 2')"
+        )
+        Post = apps.get_model('posts', 'Post')
+        for pk, text in Post.objects.values_list('pk', 'text').iterator():
+            schema_editor.execute(
+                'INSERT INTO posts_post_fts (rowid, body) VALUES (%s, %s)',
+                [pk, ' '.join(stems(text))]
+            )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX posts_post_text_fts_idx ON posts_post USING GIN '
+            "(to_tsvector('russian'::regconfig, COALESCE(text, '')))"
+        )
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE posts_post_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX posts_post_text_fts_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_auto_20261018_1856'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
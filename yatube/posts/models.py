@@ -1,10 +1,44 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import DatabaseError, models, router, transaction
 
 User = get_user_model()
 
 
-class Post(models.Model):
+class CountedModel(models.Model):
+    """Модель с денормализованными счётчиками.
+
+    Счётчики меняются только через F()-обновления, поэтому обычное
+    сохранение загруженного объекта не перезаписывает их устаревшими
+    значениями из памяти. Если строки уже нет, объект сохраняется
+    обычным образом и вставляется заново.
+    """
+    counter_fields = ()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or args or (
+                kwargs.get('update_fields') is not None):
+            return super().save(*args, **kwargs)
+        fields = [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name not in self.counter_fields
+        ]
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+        try:
+            # Точка сохранения: ошибка не должна ломать внешнюю транзакцию.
+            with transaction.atomic(using=using):
+                super().save(update_fields=fields, **kwargs)
+        except DatabaseError:
+            if type(self)._base_manager.using(using).filter(
+                    pk=self.pk).exists():
+                raise
+            super().save(**kwargs)
+
+
+class Post(CountedModel):
     text = models.TextField(
         'Текст поста',
         help_text='Введите текст поста'
@@ -33,18 +67,46 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+
+    counter_fields = ('comments_count',)
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:15]
 
 
-class Group(models.Model):
+class Group(CountedModel):
     title = models.CharField(max_length=200, unique=True)
     slug = models.SlugField(max_length=200, unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False
+    )
+
+    counter_fields = ('posts_count',)
 
     def __str__(self) -> str:
         return self.title
@@ -80,6 +142,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text
@@ -99,3 +167,92 @@ class Follow(models.Model):
 
     class Meta:
         unique_together = ['user', 'author']
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор поста'
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        ordering = ['-pub_date', '-post_id']
+        unique_together = ['user', 'post']
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx'
+            ),
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_user_author_idx'
+            ),
+        ]
+
+
+class Notification(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Получатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='notifications',
+        verbose_name='Новый пост'
+    )
+    created = models.DateTimeField('Дата уведомления', auto_now_add=True)
+    is_read = models.BooleanField('Прочитано', default=False)
+
+    class Meta:
+        ordering = ['-created', '-id']
+        unique_together = ['user', 'post']
+        indexes = [
+            models.Index(
+                fields=['user', '-created', '-id'],
+                name='notification_user_idx'
+            ),
+            models.Index(
+                fields=['user', 'is_read'],
+                name='notification_unread_idx'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.user}: {self.post}'
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    def __str__(self) -> str:
+        return str(self.user)
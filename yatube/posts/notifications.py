@@ -0,0 +1,122 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from core.routers import primary
+
+from .cache import get_version, reset, version_key
+from .models import Follow, Notification, Post
+
+NOTIFICATION_BATCH_SIZE: int = 1000
+UNREAD_PREFIX: str = 'notifications-unread'
+
+
+def schedule(post):
+    """Заказывает уведомления о новом посте, не задерживая запрос."""
+    if not settings.NOTIFICATIONS_ASYNC:
+        return notify_followers(post.pk)
+    from .tasks import notify_followers as task
+    return task.delay(post.pk)
+
+
+def notify_followers(post_id):
+    """Записывает уведомления всем подписчикам автора пачками."""
+    author_id = Post.objects.filter(
+        pk=post_id).values_list('author_id', flat=True).first()
+    if author_id is None:
+        return 0
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).order_by('user_id')
+    notified = 0
+    batch = []
+    for user_id in followers.iterator(chunk_size=NOTIFICATION_BATCH_SIZE):
+        batch.append(user_id)
+        if len(batch) == NOTIFICATION_BATCH_SIZE:
+            notified += write(post_id, batch)
+            batch = []
+    if batch:
+        notified += write(post_id, batch)
+    return notified
+
+
+def write(post_id, user_ids):
+    Notification.objects.bulk_create(
+        [Notification(user_id=user_id, post_id=post_id)
+         for user_id in user_ids],
+        ignore_conflicts=True,
+    )
+    reset_counters(user_ids)
+    return len(user_ids)
+
+
+def reset_counters(user_ids):
+    reset(version_key('notifications', user_id) for user_id in user_ids)
+
+
+def unread_count(user_id):
+    """Число непрочитанных уведомлений из кэша.
+
+    Ключ счётчика содержит версию уведомлений пользователя, поэтому
+    новые уведомления и отметка о прочтении сразу дают новый ключ.
+    """
+    version = get_version('notifications', user_id)
+    return cache.get_or_set(
+        f'{UNREAD_PREFIX}:{user_id}:{version}',
+        lambda: count_unread(user_id),
+        settings.NOTIFICATIONS_CACHE_TIMEOUT,
+    )
+
+
+def count_unread(user_id):
+    with primary():
+        return Notification.objects.filter(
+            user_id=user_id, is_read=False).count()
+
+
+def mark_read(user_id):
+    updated = Notification.objects.filter(
+        user_id=user_id, is_read=False).update(is_read=True)
+    if updated:
+        reset_counters([user_id])
+    return updated
+
+
+def forget(post):
+    """Заказывает сброс счётчиков подписчиков после удаления поста.
+
+    Уведомления удаляются с постом каскадно, а подписчиков у автора
+    может быть много, поэтому счётчики сбрасывает задача очереди — одна
+    на автора, сколько бы его постов ни удалили.
+    """
+    if not settings.NOTIFICATIONS_ASYNC:
+        return forget_followers(post.author_id)
+    from .tasks import forget_followers as task
+    return task.enqueue((post.author_id,), key=str(post.author_id))
+
+
+def forget_followers(author_id):
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    reset_counters(followers.iterator(chunk_size=NOTIFICATION_BATCH_SIZE))
+
+
+def forget_author(author_id):
+    """Перед удалением аккаунта: его подписки удалятся вместе с ним.
+
+    Подписчики передаются в очередь пачками, пока они ещё известны.
+    """
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).order_by('user_id')
+    if not settings.NOTIFICATIONS_ASYNC:
+        return reset_counters(followers.iterator())
+    from .tasks import reset_counters as task
+    batch = []
+    for user_id in followers.iterator(chunk_size=NOTIFICATION_BATCH_SIZE):
+        batch.append(user_id)
+        if len(batch) == NOTIFICATION_BATCH_SIZE:
+            task.delay(batch)
+            batch = []
+    if batch:
+        task.delay(batch)
@@ -0,0 +1,137 @@
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .stemmer import stems
+
+BACKENDS = {
+    'sqlite': 'posts.search.SQLiteSearchBackend',
+    'postgresql': 'posts.search.PostgresSearchBackend',
+}
+
+
+class SQLiteSearchBackend:
+    """Поиск по виртуальной таблице FTS5 со стеммированным текстом постов.
+
+    Стемминг выполняется в Python, потому что токенизаторы FTS5 не умеют
+    приводить русские слова к основе.
+    """
+    table = 'posts_post_fts'
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, body) VALUES (%s, %s)',
+                [post.pk, ' '.join(stems(post.text))]
+            )
+
+    def index_many(self, posts):
+        """Индексирует пачку новых постов, например после bulk_create."""
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT OR REPLACE INTO {self.table} (rowid, body) '
+                f'VALUES (%s, %s)',
+                [(post.pk, ' '.join(stems(post.text))) for post in posts]
+            )
+
+    def index_missing(self, batch_size=1000):
+        """Индексирует посты, которых ещё нет в таблице FTS5."""
+        posts = Post.objects.only('id', 'text').order_by('pk')
+        last = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last)[:batch_size])
+            if not batch:
+                return
+            last = batch[-1].pk
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT rowid FROM {self.table} '
+                    f'WHERE rowid BETWEEN %s AND %s',
+                    [batch[0].pk, last]
+                )
+                indexed = {row[0] for row in cursor.fetchall()}
+            self.index_many(
+                [post for post in batch if post.pk not in indexed])
+
+    def remove(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [post.pk])
+
+    def search(self, query):
+        terms = stems(query)
+        if not terms:
+            return []
+        return RankedResults(self.table, ' '.join(f'"{t}"' for t in terms))
+
+
+class RankedResults:
+    """Ленивая выборка для Paginator: считает и режет результаты в FTS5."""
+
+    def __init__(self, table, match):
+        self.table = table
+        self.match = match
+
+    def count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {self.table} '
+                f'WHERE {self.table} MATCH %s',
+                [self.match]
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, index.stop - index.start, index.start]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.objects.select_related('author', 'group').in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+class PostgresSearchBackend:
+    """Поиск через to_tsvector с русской конфигурацией.
+
+    Вектор по тексту поддерживает GIN-индекс по выражению, поэтому
+    отдельная синхронизация при сохранении не нужна.
+    """
+    config = 'russian'
+
+    def index(self, post):
+        pass
+
+    def index_many(self, posts):
+        pass
+
+    def index_missing(self, batch_size=1000):
+        pass
+
+    def remove(self, post):
+        pass
+
+    def search(self, query):
+        from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                                    SearchVector)
+        vector = SearchVector('text', config=self.config)
+        search_query = SearchQuery(query, config=self.config)
+        return Post.objects.select_related('author', 'group').annotate(
+            search=vector,
+            rank=SearchRank(vector, search_query),
+        ).filter(search=search_query).order_by('-rank', '-pub_date')
+
+
+def get_backend():
+    path = settings.SEARCH_BACKEND or BACKENDS[connection.vendor]
+    return import_string(path)()
@@ -0,0 +1,129 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import cache, counters, feed, notifications, search
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Поля пользователя, из которых собирается имя автора на страницах
+NAME_FIELDS = frozenset(('first_name', 'last_name'))
+
+
+@receiver(pre_save, sender=Post)
+def post_pre_save(sender, instance, **kwargs):
+    instance._previous_group_id = instance.pk and Post.objects.filter(
+        pk=instance.pk).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if created:
+        feed.schedule(instance)
+        notifications.schedule(instance)
+        counters.adjust_user(instance.author_id, posts_count=1)
+        counters.adjust_group(instance.group_id, 1)
+    else:
+        feed.refresh(instance.author_id)
+        if previous_group_id != instance.group_id:
+            counters.adjust_group(previous_group_id, -1)
+            counters.adjust_group(instance.group_id, 1)
+    search.get_backend().index(instance)
+    cache.bump_post(instance, previous_group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    search.get_backend().remove(instance)
+    notifications.forget(instance)
+    counters.adjust_user(instance.author_id, posts_count=-1)
+    counters.adjust_group(instance.group_id, -1)
+    feed.refresh(instance.author_id)
+    cache.bump_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust_post(instance.post_id, 1)
+    cache.bump([cache.version_key('post', instance.post_id)])
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.adjust_post(instance.post_id, -1)
+    cache.bump([cache.version_key('post', instance.post_id)])
+
+
+@receiver((post_save, post_delete), sender=Group)
+def group_changed(sender, instance, created=False, **kwargs):
+    cache.bump([
+        cache.version_key('index'),
+        cache.version_key('group', instance.pk),
+    ])
+    if not created:
+        # Ссылки на группу есть и в профилях, и в лентах подписок.
+        bump_group_authors(instance)
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    bump_group_authors(instance)
+
+
+def bump_group_authors(group):
+    authors = group.posts.values_list('author_id', flat=True).distinct()
+    for author_id in authors.order_by():
+        cache.bump([cache.version_key('profile', author_id)])
+        feed.refresh(author_id)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    notifications.forget_author(instance.pk)
+
+
+@receiver(pre_save, sender=User)
+def user_pre_save(sender, instance, update_fields=None, **kwargs):
+    # Вход сохраняет только last_login, имя при этом не меняется.
+    if update_fields is not None and not NAME_FIELDS & set(update_fields):
+        instance._previous_name = instance.get_full_name()
+        return
+    instance._previous_name = instance.pk and ' '.join(
+        User.objects.filter(pk=instance.pk).values_list(
+            'first_name', 'last_name').first() or ()).strip()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif getattr(instance, '_previous_name', None) != (
+            instance.get_full_name()):
+        # Имя автора есть в карточках его постов на всех лентах.
+        groups = instance.posts.exclude(group=None).values_list(
+            'group_id', flat=True).distinct()
+        cache.bump([
+            cache.version_key('index'),
+            cache.version_key('profile', instance.pk),
+            *(cache.version_key('group', group_id)
+              for group_id in groups.order_by()),
+        ])
+        feed.refresh(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        feed.subscribe(instance.user_id, instance.author_id)
+        counters.adjust_user(instance.author_id, followers_count=1)
+        counters.adjust_user(instance.user_id, following_count=1)
+    cache.bump([cache.version_key('follow', instance.user_id)])
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    feed.unsubscribe(instance.user_id, instance.author_id)
+    counters.adjust_user(instance.author_id, followers_count=-1)
+    counters.adjust_user(instance.user_id, following_count=-1)
+    cache.bump([cache.version_key('follow', instance.user_id)])
@@ -0,0 +1,69 @@
+"""Стеммер Портера (Snowball) для русского языка."""
+import re
+
+VOWELS: str = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = re.compile(
+    r'(?:ив|ивши|ившись|ыв|ывши|ывшись|(?<=[ая])(?:в|вши|вшись))$')
+REFLEXIVE = re.compile(r'(?:ся|сь)$')
+ADJECTIVE = re.compile(
+    r'(?:ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых'
+    r'|ую|юю|ая|яя|ою|ею)$')
+PARTICIPLE = re.compile(r'(?:ивш|ывш|ующ|(?<=[ая])(?:ем|нн|вш|ющ|щ))$')
+VERB = re.compile(
+    r'(?:ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|ено'
+    r'|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю'
+    r'|(?<=[ая])(?:ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно))$')
+NOUN = re.compile(
+    r'(?:а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем'
+    r'|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+DERIVATIONAL = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'ейше?$')
+WORD = re.compile(r'\w+')
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv_start = next(
+        (i + 1 for i, letter in enumerate(word) if letter in VOWELS), None)
+    if rv_start is None:
+        return word
+    r2_start = region(word, region(word, 0))
+    prefix, rv = word[:rv_start], word[rv_start:]
+
+    rv, removed = PERFECTIVE_GERUND.subn('', rv, 1)
+    if not removed:
+        rv = REFLEXIVE.sub('', rv, 1)
+        rv, removed = ADJECTIVE.subn('', rv, 1)
+        if removed:
+            rv = PARTICIPLE.sub('', rv, 1)
+        else:
+            rv, removed = VERB.subn('', rv, 1)
+            if not removed:
+                rv = NOUN.sub('', rv, 1)
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    match = DERIVATIONAL.search(rv)
+    if match and rv_start + match.start() >= r2_start:
+        rv = rv[:match.start()]
+
+    rv, removed = SUPERLATIVE.subn('', rv, 1)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif not removed and rv.endswith('ь'):
+        rv = rv[:-1]
+    return prefix + rv
+
+
+def region(word, start):
+    """Начало области после первой согласной, следующей за гласной."""
+    for i in range(start + 1, len(word)):
+        if word[i] not in VOWELS and word[i - 1] in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def stems(text):
+    return [stem(word) for word in WORD.findall(text)]
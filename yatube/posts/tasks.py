@@ -0,0 +1,33 @@
+from tasks.queue import task
+
+from . import feed, notifications, thumbnails
+
+
+@task(priority=5)
+def generate_thumbnail(name, geometry_string, options):
+    thumbnails.generate(name, geometry_string, options)
+
+
+@task(priority=5)
+def deliver_post(post_id):
+    feed.deliver(post_id)
+
+
+@task(priority=5)
+def bump_followers(author_id):
+    feed.bump_followers(author_id)
+
+
+@task(priority=5)
+def notify_followers(post_id):
+    notifications.notify_followers(post_id)
+
+
+@task(priority=5)
+def forget_followers(author_id):
+    notifications.forget_followers(author_id)
+
+
+@task(priority=5)
+def reset_counters(user_ids):
+    notifications.reset_counters(user_ids)
@@ -0,0 +1,61 @@
+import logging
+
+from django import template
+from django.conf import settings
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from posts.thumbnails import PlaceholderImageFile
+
+logger = logging.getLogger(__name__)
+register = template.Library()
+
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'PNG': 'image/png',
+    'JPEG': 'image/jpeg',
+}
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def responsive_image(image):
+    """Картинка поста в нескольких размерах и форматах через <picture>.
+
+    Последний формат из IMAGE_VARIANT_FORMATS уходит в <img> как запасной
+    для браузеров без поддержки остальных.
+    """
+    if not image:
+        return {}
+    try:
+        return picture_context(image)
+    except Exception:
+        if thumbnail_settings.THUMBNAIL_DEBUG:
+            raise
+        logger.exception('Не удалось подготовить картинку %s', image)
+        return {}
+
+
+def picture_context(image):
+    sources = []
+    for geometry_string, options in settings.THUMBNAIL_PRESETS:
+        thumbnail = get_thumbnail(image, geometry_string, **options)
+        sources.append((options['format'], thumbnail))
+    if any(isinstance(thumbnail, PlaceholderImageFile)
+           for _, thumbnail in sources):
+        return {'placeholder': sources[-1][1]}
+    srcsets = {}
+    for image_format, thumbnail in sources:
+        srcsets.setdefault(image_format, []).append(
+            f'{thumbnail.url} {thumbnail.width}w')
+    *formats, fallback_format = srcsets
+    return {
+        'sources': [
+            {'type': MIME_TYPES[image_format],
+             'srcset': ', '.join(srcsets[image_format])}
+            for image_format in formats
+        ],
+        'fallback': sources[-1][1],
+        'fallback_srcset': ', '.join(srcsets[fallback_format]),
+        'sizes': settings.IMAGE_VARIANT_SIZES,
+    }
@@ -0,0 +1,161 @@
+import json
+import threading
+from http import HTTPStatus
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import live
+from posts.cache import new_version, version_key
+from posts.models import Follow, Group, Post, User
+
+TEST_USERNAME: str = 'auth'
+POST_TEXT: str = 'Тестовый текст'
+GROUP_SLUG: str = 'test-slug'
+
+
+class BrokerTests(TestCase):
+    def test_local_publish_wakes_listener(self):
+        broker = live.LocalBroker()
+        channels = [version_key('index')]
+        with broker.listen(channels):
+            state = broker.state(channels)
+            threading.Timer(0.05, broker.publish, [channels]).start()
+            self.assertNotEqual(broker.wait(channels, state, 5), state)
+            self.assertEqual(
+                broker.wait(channels, broker.state(channels), 0),
+                broker.state(channels),
+            )
+
+    def test_local_channels_dropped_without_listeners(self):
+        """Публикации в каналы без слушателей не копятся в памяти."""
+        broker = live.LocalBroker()
+        channels = [version_key('group', 1)]
+        broker.publish(channels)
+        self.assertEqual(broker.published, {})
+        with broker.listen(channels), broker.listen(channels):
+            broker.publish(channels)
+        self.assertEqual(broker.published, {})
+        self.assertFalse(broker.listeners)
+
+    @override_settings(LIVE_UPDATES_ENABLED=True)
+    def test_only_feed_channels_published(self):
+        """Брокеру уходят только ключи лент с живыми обновлениями."""
+        keys = [
+            version_key('index'),
+            version_key('group', 1),
+            version_key('follow', 1),
+            version_key('profile', 1),
+            version_key('post', 1),
+            version_key('notifications', 1),
+        ]
+        with mock.patch.object(live, 'get_broker') as get_broker, \
+                mock.patch.object(live.transaction, 'on_commit') as on_commit:
+            live.publish(keys)
+            on_commit.call_args[0][0]()
+        get_broker().publish.assert_called_once_with(keys[:3])
+
+    @override_settings(LIVE_POLL_SECONDS=0.05)
+    def test_cache_broker_sees_other_processes(self):
+        """Смену версии в кэше другим процессом брокер замечает опросом."""
+        broker = live.CacheBroker()
+        channels = [version_key('group', 1)]
+        state = broker.state(channels)
+        threading.Timer(
+            0.1, cache.set, [channels[0], new_version(), None]).start()
+        self.assertNotEqual(broker.wait(channels, state, 5), state)
+
+
+@override_settings(
+    LIVE_UPDATES_ENABLED=True, LIVE_LONG_POLL_SECONDS=0, LIVE_STREAM_SECONDS=0)
+class LiveUpdatesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug=GROUP_SLUG, description='Описание')
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.post = Post.objects.create(author=cls.author, text=POST_TEXT)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def url(self, feed, **params):
+        return reverse('posts:live_updates', args=[feed]), params
+
+    def poll(self, feed, **params):
+        path, params = self.url(feed, **params)
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return response.json()['count']
+
+    def test_long_poll_counts_new_posts(self):
+        since = self.post.pk
+        self.assertEqual(self.poll('index', since=since), 0)
+        Post.objects.create(
+            author=self.author, group=self.group, text=POST_TEXT)
+        Post.objects.create(author=self.user, text=POST_TEXT)
+        self.assertEqual(self.poll('index', since=since), 2)
+        self.assertEqual(
+            self.poll('group', group=GROUP_SLUG, since=since), 1)
+        self.assertEqual(self.poll('follow', since=since), 1)
+        self.assertEqual(self.poll('index'), 0)
+
+    def test_event_stream(self):
+        Post.objects.create(author=self.author, text=POST_TEXT)
+        path, params = self.url('index', since=self.post.pk)
+        response = self.client.get(
+            path, params, HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        events = b''.join(response.streaming_content).decode()
+        self.assertIn('event: posts\ndata: {"count": 1}\n\n', events)
+
+    def test_unknown_feeds(self):
+        for path, params in (
+            self.url('group', group='missing'),
+            self.url('everything'),
+        ):
+            with self.subTest(path=path):
+                response = self.client.get(path, params)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        path, params = self.url('follow')
+        response = Client().get(path, params)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_first_page_subscribes(self):
+        """Только первая страница ленты подписывается на обновления."""
+        response = self.client.get(reverse('posts:index'))
+        path, _ = self.url('index')
+        self.assertEqual(
+            response.context['live_url'](), f'{path}?since={self.post.pk}')
+        response = self.client.get(reverse('posts:index'), {'page': 1})
+        self.assertIsNone(response.context['live_url']())
+        self.assertNotContains(response, 'EventSource')
+
+    def test_disabled(self):
+        """Выключенные обновления не подписывают страницы и не ждут."""
+        with self.settings(
+                LIVE_UPDATES_ENABLED=False, LIVE_LONG_POLL_SECONDS=60):
+            response = self.client.get(reverse('posts:follow_index'))
+            self.assertNotContains(response, 'EventSource')
+            Post.objects.create(author=self.author, text=POST_TEXT)
+            self.assertEqual(self.poll('index', since=self.post.pk), 1)
+            path, params = self.url('index')
+            response = self.client.get(
+                path, params, HTTP_ACCEPT='text/event-stream')
+            self.assertEqual(response.status_code, HTTPStatus.NO_CONTENT)
+
+
+class StreamTests(TestCase):
+    @override_settings(LIVE_STREAM_SECONDS=0.2, LIVE_KEEPALIVE_SECONDS=0.1)
+    def test_keepalive_until_deadline(self):
+        events = list(live.stream(live.index_feed(), 0))
+        self.assertEqual(events[0], 'retry: 5000\n\n')
+        self.assertEqual(json.loads(events[1].split('data: ')[1]), {
+            'count': 0})
+        self.assertIn(': keepalive\n\n', events[2:])
@@ -1,6 +1,9 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import Comment, Follow, Group, Post, User, UserStats
 
 TEST_USERNAME: str = 'auth'
 GROUP_TITLE: str = 'Тестовая группа'
@@ -8,6 +11,8 @@ GROUP_SLUG: str = 'test-slug'
 GROUP_DESC: str = 'Тестовое описание'
 POST_TEXT: str = 'Тестовый текст'
 TEXT_MULTIPLIER: int = 10
+FOLLOWER_USERNAME: str = 'follower'
+COMMENT_TEXT: str = 'Тестовый комментарий'
 
 
 class PostModelTest(TestCase):
@@ -62,3 +67,86 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER_USERNAME)
+        cls.group = Group.objects.create(
+            title=GROUP_TITLE,
+            slug=GROUP_SLUG,
+            description=GROUP_DESC
+        )
+
+    def assertCounters(self, posts, comments, followers):
+        self.user.stats.refresh_from_db()
+        self.follower.stats.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(self.user.stats.posts_count, posts)
+        self.assertEqual(self.group.posts_count, posts)
+        self.assertEqual(self.user.stats.followers_count, followers)
+        self.assertEqual(self.follower.stats.following_count, followers)
+        self.assertEqual(
+            sum(Post.objects.values_list('comments_count', flat=True)),
+            comments
+        )
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(
+            author=self.user, text=POST_TEXT, group=self.group)
+        Comment.objects.create(
+            post=post, author=self.follower, text=COMMENT_TEXT)
+        follow = Follow.objects.create(user=self.follower, author=self.user)
+        self.assertCounters(posts=1, comments=1, followers=1)
+        post.group = None
+        post.save()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        post.group = self.group
+        post.save()
+        follow.delete()
+        Comment.objects.all().delete()
+        self.assertCounters(posts=1, comments=0, followers=0)
+        post.delete()
+        self.assertCounters(posts=0, comments=0, followers=0)
+
+    def test_counters_not_below_zero(self):
+        """Разошедшиеся нулевые счётчики не уходят в минус."""
+        post = Post.objects.create(
+            author=self.user, text=POST_TEXT, group=self.group)
+        Comment.objects.create(
+            post=post, author=self.follower, text=COMMENT_TEXT)
+        Follow.objects.create(user=self.follower, author=self.user)
+        UserStats.objects.update(
+            posts_count=0, followers_count=0, following_count=0)
+        Group.objects.update(posts_count=0)
+        Post.objects.update(comments_count=0)
+        Follow.objects.all().delete()
+        Comment.objects.all().delete()
+        self.assertCounters(posts=0, comments=0, followers=0)
+        post.delete()
+        self.assertCounters(posts=0, comments=0, followers=0)
+
+    def test_save_after_row_deleted(self):
+        """Объект, строку которого удалили, сохраняется заново."""
+        post = Post.objects.create(author=self.user, text=POST_TEXT)
+        Post.objects.filter(pk=post.pk).delete()
+        post.save()
+        self.assertTrue(Post.objects.filter(pk=post.pk).exists())
+
+    def test_recount_repairs_drift(self):
+        """Команда recount восстанавливает разошедшиеся счётчики."""
+        post = Post.objects.create(
+            author=self.user, text=POST_TEXT, group=self.group)
+        Comment.objects.create(
+            post=post, author=self.follower, text=COMMENT_TEXT)
+        Follow.objects.create(user=self.follower, author=self.user)
+        UserStats.objects.update(
+            posts_count=5, followers_count=5, following_count=5)
+        Group.objects.update(posts_count=5)
+        Post.objects.update(comments_count=5)
+        call_command('recount', stdout=StringIO())
+        self.assertCounters(posts=1, comments=1, followers=1)
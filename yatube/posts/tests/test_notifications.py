@@ -0,0 +1,149 @@
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import notifications
+from posts.cache import version_key
+from posts.models import Follow, Notification, Post, User
+from tasks.models import Task
+from tasks.worker import Worker
+
+TEST_USERNAME: str = 'auth'
+FOLLOWER_USERNAME: str = 'follower'
+POST_TEXT: str = 'Новая запись автора'
+
+
+class NotificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username=TEST_USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER_USERNAME)
+        cls.stranger = User.objects.create_user(username='stranger')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.follower)
+        self.worker = Worker(processes=0, poll=0)
+
+    def publish(self):
+        """Создаёт пост и выполняет задачу рассылки уведомлений."""
+        post = Post.objects.create(author=self.author, text=POST_TEXT)
+        self.worker.run(once=True)
+        return post
+
+    def test_followers_notified(self):
+        """Новый пост создаёт уведомления только подписчикам автора."""
+        post = self.publish()
+        self.assertEqual(
+            list(Notification.objects.values_list('user', 'post')),
+            [(self.follower.pk, post.pk)],
+        )
+        self.assertEqual(notifications.unread_count(self.follower.pk), 1)
+        self.assertEqual(notifications.unread_count(self.stranger.pk), 0)
+
+    def test_batches(self):
+        """Рассылка идёт пачками и не дублирует уведомления."""
+        for number in range(5):
+            Follow.objects.create(
+                user=User.objects.create_user(username=f'reader{number}'),
+                author=self.author,
+            )
+        post = Post.objects.create(author=self.author, text=POST_TEXT)
+        notifications.NOTIFICATION_BATCH_SIZE, size = 2, (
+            notifications.NOTIFICATION_BATCH_SIZE)
+        self.addCleanup(
+            setattr, notifications, 'NOTIFICATION_BATCH_SIZE', size)
+        with self.assertNumQueries(5):
+            self.assertEqual(notifications.notify_followers(post.pk), 6)
+        self.assertEqual(Notification.objects.filter(post=post).count(), 6)
+
+    def test_fan_out_queued(self):
+        """Пост создаётся без уведомлений, их пишет воркер очереди."""
+        post = Post.objects.create(author=self.author, text=POST_TEXT)
+        self.assertFalse(Notification.objects.exists())
+        self.assertEqual(Task.objects.count(), 1)
+        self.worker.run(once=True)
+        self.assertTrue(
+            Notification.objects.filter(
+                user=self.follower, post=post).exists())
+
+    @override_settings(NOTIFICATIONS_ASYNC=False)
+    def test_fan_out_inline(self):
+        Post.objects.create(author=self.author, text=POST_TEXT)
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(notifications.unread_count(self.follower.pk), 1)
+
+    def test_badge_and_mark_read(self):
+        self.publish()
+        self.publish()
+        response = self.client.get(reverse('posts:notifications'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.context['page_obj']), 2)
+        self.assertContains(response, '<span class="badge bg-danger">2</span>')
+        response = self.client.post(reverse('posts:notifications_read'))
+        self.assertRedirects(response, reverse('posts:notifications'))
+        self.assertFalse(
+            Notification.objects.filter(is_read=False).exists())
+        response = self.client.get(reverse('posts:notifications'))
+        self.assertNotContains(response, 'badge bg-danger')
+
+    def test_counter_cached(self):
+        """Счётчик читается из кэша, пока не изменились уведомления."""
+        self.publish()
+        notifications.unread_count(self.follower.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(notifications.unread_count(self.follower.pk), 1)
+        post = self.publish()
+        self.assertEqual(notifications.unread_count(self.follower.pk), 2)
+        post.delete()
+        self.worker.run(once=True)
+        self.assertEqual(notifications.unread_count(self.follower.pk), 1)
+
+    def test_forget_queued_once_per_author(self):
+        """Удаление постов не ждёт сброса счётчиков подписчиков."""
+        self.publish()
+        self.publish()
+        notifications.unread_count(self.follower.pk)
+        Task.objects.all().delete()
+        Post.objects.all().delete()
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(notifications.unread_count(self.follower.pk), 2)
+        self.worker.run(once=True)
+        self.assertEqual(notifications.unread_count(self.follower.pk), 0)
+
+    def test_author_deleted(self):
+        """Удаление аккаунта сбрасывает счётчики его подписчиков."""
+        self.publish()
+        self.assertEqual(notifications.unread_count(self.follower.pk), 1)
+        User.objects.filter(pk=self.author.pk).delete()
+        self.worker.run(once=True)
+        self.assertEqual(notifications.unread_count(self.follower.pk), 0)
+
+    def test_write_does_not_fill_cache(self):
+        """Рассылка не создаёт в кэше ключей версий подписчиков."""
+        self.publish()
+        self.assertIsNone(
+            cache.get(version_key('notifications', self.follower.pk)))
+
+    def test_etag_changes_with_notifications(self):
+        """Новое уведомление меняет ETag страниц подписчика."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            HTTPStatus.NOT_MODIFIED,
+        )
+        self.publish()
+        notifications.mark_read(self.follower.pk)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_guest_redirected(self):
+        response = Client().get(reverse('posts:notifications'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.client.get(reverse('posts:notifications_read'))
+        self.assertEqual(
+            response.status_code, HTTPStatus.METHOD_NOT_ALLOWED)
@@ -0,0 +1,183 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import feed
+from posts.cache import get_version
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+from tasks.worker import Worker
+
+NUM_TEST_POSTS: int = 30
+NUM_EXTRA_OBJECTS: int = 15
+TEST_USERNAME: str = 'auth'
+TEST2_USERNAME: str = 'follower'
+TEST3_USERNAME: str = 'reader'
+GROUP_SLUG: str = 'test-slug'
+FEED_TABLES = ('posts_post', 'posts_feedentry', 'posts_comment')
+
+
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.user2 = User.objects.create_user(username=TEST2_USERNAME)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=GROUP_SLUG,
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user2, author=cls.user)
+        for i in range(NUM_TEST_POSTS):
+            post = Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый текст {i}',
+                group=cls.group,
+            )
+            Comment.objects.create(
+                post=post,
+                author=cls.user2,
+                text=f'Комментарий {i}',
+            )
+        cls.post = post
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user2)
+
+    def feed_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [
+            query['sql'] for query in queries.captured_queries
+            if 'ORDER BY' in query['sql']
+            and query['sql'].split(' FROM ')[1].split()[0].strip('"')
+            in FEED_TABLES
+        ]
+
+    def test_feed_queries_use_indexes(self):
+        """Запросы лент читают индекс без полного сканирования и сортировки."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': GROUP_SLUG}),
+            reverse('posts:profile', kwargs={'username': TEST_USERNAME}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}),
+        ]
+        if connection.vendor != 'sqlite':
+            self.skipTest('Проверка плана написана для SQLite')
+        for url in urls:
+            queries = self.feed_queries(url)
+            with self.subTest(url=url):
+                self.assertTrue(queries)
+            for sql in queries:
+                with self.subTest(url=url, sql=sql), \
+                        connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                    plan = [row[-1] for row in cursor.fetchall()]
+                    for step in plan:
+                        self.assertNotIn('TEMP B-TREE', step)
+                        if step.startswith('SCAN'):
+                            self.assertIn('INDEX', step)
+
+
+class QueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.user2 = User.objects.create_user(username=TEST2_USERNAME)
+        cls.user3 = User.objects.create_user(username=TEST3_USERNAME)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug=GROUP_SLUG,
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.user2, author=cls.user)
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый текст',
+            group=cls.group,
+        )
+
+    def create_objects(self, numbers):
+        for i in numbers:
+            author = User.objects.create_user(username=f'author{i}')
+            Follow.objects.create(user=self.user2, author=author)
+            Follow.objects.create(user=self.user3, author=author)
+            Post.objects.create(
+                author=self.user,
+                text=f'Тестовый текст {i}',
+                group=self.group,
+            )
+            Post.objects.create(author=author, text=f'Пост автора {i}')
+            Comment.objects.create(
+                post=self.post,
+                author=author,
+                text=f'Комментарий {i}',
+            )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user2)
+
+    def count_queries(self, method, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            getattr(self.client, method)(url, {'text': 'Комментарий'})
+        return len(queries)
+
+    def test_queries_do_not_grow_with_data(self):
+        """Число запросов страницы не зависит от объёма данных."""
+        urls = {
+            reverse('posts:index'): 'get',
+            reverse('posts:group_list', kwargs={'slug': GROUP_SLUG}): 'get',
+            reverse('posts:profile', kwargs={'username': TEST_USERNAME}):
+                'get',
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id}):
+                'get',
+            reverse('posts:post_create'): 'get',
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}):
+                'get',
+            reverse('posts:add_comment', kwargs={'post_id': self.post.id}):
+                'post',
+            reverse('posts:follow_index'): 'get',
+            reverse('posts:profile_follow', kwargs={
+                'username': TEST3_USERNAME}): 'get',
+            reverse('posts:profile_unfollow', kwargs={
+                'username': TEST3_USERNAME}): 'get',
+        }
+        self.create_objects(range(1))
+        before = {
+            url: self.count_queries(method, url)
+            for url, method in urls.items()
+        }
+        self.create_objects(range(1, NUM_EXTRA_OBJECTS))
+        for url, method in urls.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(method, url), before[url])
+
+    @override_settings(FEED_ASYNC=True)
+    @mock.patch.object(feed, 'FEED_BATCH_SIZE', 1)
+    def test_posting_does_not_grow_with_followers(self):
+        """Ленты подписчиков и их версии пишет воркер, а не публикация."""
+        queries = []
+        for number in range(2):
+            Follow.objects.create(
+                user=User.objects.create_user(
+                    username=f'{TEST3_USERNAME}{number}'),
+                author=self.user,
+            )
+            with CaptureQueriesContext(connection) as captured:
+                post = Post.objects.create(author=self.user, text='Новый')
+            queries.append(len(captured))
+        self.assertEqual(queries[0], queries[1])
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        version = get_version('follow', self.user2.pk)
+        with mock.patch.object(
+                transaction, 'on_commit', lambda func, using=None: func()):
+            Worker(processes=0, poll=0).run(once=True)
+        self.assertEqual(FeedEntry.objects.filter(post=post).count(), 3)
+        self.assertNotEqual(get_version('follow', self.user2.pk), version)
@@ -0,0 +1,73 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from posts.models import Post, User
+from posts.stemmer import stem
+from posts.views import POSTS_ON_PAGE
+
+TEST_USERNAME: str = 'auth'
+NUM_TEST_POSTS: int = 12
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Читаю интересную книгу о красивых городах',
+        )
+        Post.objects.create(
+            author=cls.user,
+            text='Книги, книги и ещё раз книги',
+        )
+        Post.objects.create(author=cls.user, text='Пост без совпадений')
+
+    def setUp(self):
+        self.client = Client()
+
+    def search(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+        return list(response.context['page_obj'])
+
+    def test_stem_russian_words(self):
+        """Словоформы приводятся к общей основе."""
+        stems = {stem(word) for word in ('книга', 'книги', 'книгу', 'Книгой')}
+        self.assertEqual(stems, {'книг'})
+        self.assertEqual(stem('красивых'), 'красив')
+
+    def test_search_finds_word_forms_ranked(self):
+        """Поиск находит словоформы и ставит выше лучшее совпадение."""
+        results = self.search('книга')
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0].text, 'Книги, книги и ещё раз книги')
+        self.assertEqual(self.search('красивый город'), [self.post])
+        self.assertEqual(self.search('   '), [])
+
+    def test_search_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении поста."""
+        self.post.text = 'Совсем другой текст'
+        self.post.save()
+        self.assertEqual(self.search('другие тексты'), [self.post])
+        self.assertNotIn(self.post, self.search('город'))
+        self.post.delete()
+        self.assertEqual(self.search('другие тексты'), [])
+
+    def test_search_pagination_keeps_query(self):
+        """Страницы результатов сохраняют поисковый запрос."""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f'Город номер {i}')
+            for i in range(NUM_TEST_POSTS)
+        )
+        for post in Post.objects.filter(text__startswith='Город номер'):
+            post.save()
+        self.assertEqual(len(self.search('город')), POSTS_ON_PAGE)
+        self.assertEqual(
+            len(self.search('город', page=2)),
+            NUM_TEST_POSTS + 1 - POSTS_ON_PAGE
+        )
+        response = self.client.get(reverse('posts:search'), {'q': 'город'})
+        self.assertContains(
+            response, f'href="?{urlencode({"q": "город"})}&amp;page=2"')
@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import transaction
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import (Comment, FeedEntry, Follow, Group, Post, User,
+                          UserStats)
+from posts.search import get_backend
+
+TEST_USERNAME: str = 'auth'
+FOLLOWER_USERNAME: str = 'follower'
+TABLES = ('groups', 'posts', 'comments', 'follows')
+IMPORTED_TEXT: str = 'Импортированный пост'
+FOREIGN_KEY: str = 'transfer-test:foreign'
+FOREIGN_VALUE: str = 'чужой ключ'
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username=TEST_USERNAME)
+        cls.follower = User.objects.create_user(username=FOLLOWER_USERNAME)
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.user, group=cls.group, text='Читаю интересную книгу')
+        Post.objects.create(author=cls.user, text='Пост без группы')
+        Comment.objects.create(
+            post=cls.post, author=cls.follower, text='Комментарий')
+        Follow.objects.create(user=cls.follower, author=cls.user)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # Транзакция теста не коммитится, а версии лент меняются после
+        # коммита: здесь колбэки выполняются сразу, как в автокоммите.
+        on_commit = mock.patch.object(
+            transaction, 'on_commit', lambda func, using=None: func())
+        on_commit.start()
+        self.addCleanup(on_commit.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_round_trip(self):
+        """Выгруженные записи загружаются обратно со счётчиками и лентами."""
+        for format in ('jsonl', 'csv'):
+            with self.subTest(format=format):
+                for table in TABLES:
+                    call_command(
+                        'export_data', table, self.path(f'{table}.{format}'),
+                        stdout=StringIO())
+                pub_date = self.post.pub_date
+                Group.objects.all().delete()
+                Post.objects.all().delete()
+                User.objects.exclude(pk=self.follower.pk).delete()
+                for table in TABLES:
+                    call_command(
+                        'import_data', table, self.path(f'{table}.{format}'),
+                        '--create-users', '--batch-size', '1',
+                        stdout=StringIO())
+                post = Post.objects.get(pk=self.post.pk)
+                self.assertEqual(post.text, self.post.text)
+                self.assertEqual(post.pub_date, pub_date)
+                self.assertEqual(post.group.slug, self.group.slug)
+                self.assertEqual(post.author.username, TEST_USERNAME)
+                self.assertEqual(post.comments_count, 1)
+                self.assertEqual(Post.objects.count(), 2)
+                stats = UserStats.objects.get(user=post.author)
+                self.assertEqual(
+                    (stats.posts_count, stats.followers_count), (2, 1))
+                self.assertEqual(
+                    FeedEntry.objects.filter(user=self.follower).count(), 2)
+                self.assertEqual(
+                    [found.pk for found in get_backend().search('книги')],
+                    [post.pk])
+
+    def test_invalid_rows_rolled_back(self):
+        """Ошибка в строке откатывает импорт файла целиком."""
+        path = self.path('posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(
+                {'text': 'Новый пост', 'author': TEST_USERNAME}) + '\n')
+            file.write(json.dumps(
+                {'text': 'Без автора', 'author': 'nobody'}) + '\n')
+        with self.assertRaisesMessage(CommandError, 'Строка 2'):
+            call_command('import_data', 'posts', path, stdout=StringIO())
+        self.assertFalse(Post.objects.filter(text='Новый пост').exists())
+
+    def test_invalid_number_reported(self):
+        """Нечисловой ключ в файле — ошибка строки, а не падение."""
+        path = self.path('comments.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({
+                'post': 'первый', 'author': TEST_USERNAME, 'text': 'Текст',
+            }) + '\n')
+        with self.assertRaisesMessage(CommandError, 'Строка 1'):
+            call_command('import_data', 'comments', path, stdout=StringIO())
+
+    def test_import_refreshes_cached_pages(self):
+        """Импорт сбрасывает версии страниц, не очищая весь кэш."""
+        cache.set(FOREIGN_KEY, FOREIGN_VALUE)
+        profile = reverse('posts:profile', args=[TEST_USERNAME])
+        self.client.get(profile)
+        path = self.path('posts.jsonl')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(
+                {'text': IMPORTED_TEXT, 'author': TEST_USERNAME}) + '\n')
+        call_command('import_data', 'posts', path, stdout=StringIO())
+        self.assertContains(self.client.get(profile), IMPORTED_TEXT)
+        self.assertEqual(cache.get(FOREIGN_KEY), FOREIGN_VALUE)
@@ -1,17 +1,28 @@
 import shutil
 import tempfile
+import time
+from http import HTTPStatus
+from io import StringIO
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.templatetags.static import static
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Follow, Group, Post, User
-from posts.views import POSTS_ON_PAGE
+from posts import middleware, thumbnails
+from posts.cache import get_version
+from posts.models import Comment, FeedEntry, Follow, Group, Post, User
+from posts.views import COMMENTS_ON_PAGE, POSTS_ON_PAGE
 
 NUM_TEST_POSTS: int = 12
+NUM_TEST_COMMENTS: int = 25
 ALL_POSTS_COUNT: int = 13
 NUM_POSTS_SEC_PAGE = ALL_POSTS_COUNT - POSTS_ON_PAGE
 NUM_CHECK_POST: int = 13
@@ -24,6 +35,9 @@ GROUP_DESC: str = 'Тестовое описание'
 GROUP_NEW_TITLE: str = 'Заголовок новой группы'
 GROUP_NEW_SLUG: str = 'test-new-slug'
 GROUP_NEW_DESC: str = 'Описание новой группы'
+GROUP_RENAMED_SLUG: str = 'renamed-slug'
+AUTHOR_FIRST_NAME: str = 'Лев'
+AUTHOR_LAST_NAME: str = 'Толстой'
 POST_TEXT: str = 'Тестовый текст'
 POST_NEW_TEXT: str = 'Another text'
 POST_CACHE_TEXT: str = 'Test cache text'
@@ -103,6 +117,12 @@ class PostPagesTests(TestCase):
         self.auth_client_notfollow = Client()
         self.auth_client_notfollow.force_login(self.user3)
         cache.clear()
+        # Транзакция теста не коммитится, а версии лент меняются после
+        # коммита: здесь колбэки выполняются сразу, как в автокоммите.
+        on_commit = mock.patch.object(
+            transaction, 'on_commit', lambda func, using=None: func())
+        on_commit.start()
+        self.addCleanup(on_commit.stop)
 
     def test_pages_uses_correct_template(self):
         """URL-адрес использует соответствующий шаблон."""
@@ -264,6 +284,89 @@ class PostPagesTests(TestCase):
                 self.assertEqual(len(
                     response.context['page_obj']), NUM_POSTS_SEC_PAGE)
 
+    def test_cursor_pages_follow_each_other(self):
+        """Курсорная пагинация листает ленту вперёд и назад без пропусков."""
+        for reverse_name in self.pages_names:
+            with self.subTest(reverse_name=reverse_name):
+                first = self.guest_client.get(reverse_name).context['page_obj']
+                self.assertIsNone(first.previous_cursor())
+                second = self.guest_client.get(
+                    reverse_name, {'cursor': first.next_cursor()}
+                ).context['page_obj']
+                self.assertEqual(len(second), NUM_POSTS_SEC_PAGE)
+                self.assertIsNone(second.next_cursor())
+                self.assertFalse(set(first) & set(second))
+                back = self.guest_client.get(
+                    reverse_name, {'cursor': second.previous_cursor()}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+
+    def test_cursor_page_without_count_query(self):
+        """Первая страница курсорной пагинации не выполняет COUNT(*)."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                reverse('posts:index'), {'cursor': 'broken'})
+        self.assertEqual(len(response.context['page_obj']), POSTS_ON_PAGE)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_post_detail_comments_paginated(self):
+        """Комментарии поста подгружаются порциями по курсору."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post1, author=self.user2, text=f'{i}')
+            for i in range(NUM_TEST_COMMENTS)
+        )
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post1.id}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_ON_PAGE)
+        url = reverse('posts:post_comments', kwargs={'post_id': self.post1.id})
+        response = self.guest_client.get(
+            url, {'cursor': comments.next_cursor()})
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertEqual(
+            len(response.context['comments']),
+            NUM_TEST_COMMENTS - COMMENTS_ON_PAGE
+        )
+        self.assertIsNone(response.context['comments'].next_cursor())
+        data = self.guest_client.get(url, {'format': 'json'}).json()
+        self.assertEqual(len(data['comments']), COMMENTS_ON_PAGE)
+        self.assertEqual(
+            data['comments'][0]['text'], f'{NUM_TEST_COMMENTS - 1}')
+
+    def test_comments_of_missing_post(self):
+        """Комментарии несуществующего поста отдают 404."""
+        url = reverse('posts:post_comments', kwargs={'post_id': 0})
+        for params in ({}, {'format': 'json'}):
+            with self.subTest(params=params):
+                response = self.guest_client.get(url, params)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_thumbnail_prepared_in_background(self):
+        """Страница не декодирует картинку, а заказывает миниатюру в фоне."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post1.id})
+        placeholder = static(settings.THUMBNAIL_PLACEHOLDER)
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            self.assertContains(self.guest_client.get(url), placeholder)
+        self.assertEqual(
+            schedule.call_count, len(settings.THUMBNAIL_PRESETS))
+        for call in schedule.call_args_list:
+            thumbnails.generate(*call[0])
+        response = self.guest_client.get(url)
+        self.assertNotContains(response, placeholder)
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, ' 1440w', count=2)
+
+    def test_cached_placeholder_replaced(self):
+        """Готовая миниатюра сменяет заглушку и в закэшированных лентах."""
+        url = reverse('posts:index')
+        placeholder = static(settings.THUMBNAIL_PLACEHOLDER)
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            self.assertContains(self.guest_client.get(url), placeholder)
+        for call in schedule.call_args_list:
+            thumbnails.generate(*call[0])
+        self.assertNotContains(self.guest_client.get(url), placeholder)
+
     def test_index_cache_content(self):
         """Шаблон index правильно кэшируется"""
         post_cache = Post.objects.create(
@@ -274,7 +377,7 @@ class PostPagesTests(TestCase):
         page_context = response.context['page_obj'][0]
         page_content = response.content
         self.assertEqual(page_context.text, post_cache.text)
-        Post.objects.get(id=post_cache.id).delete()
+        Post.objects.filter(id=post_cache.id).update(text=POST_NEW_TEXT)
         new_response = self.auth_client_author.get(reverse('posts:index'))
         page_new_content = new_response.content
         self.assertEqual(page_content, page_new_content)
@@ -283,6 +386,248 @@ class PostPagesTests(TestCase):
         page_clear_content = clear_response.content
         self.assertNotEqual(page_content, page_clear_content)
 
+    def test_feed_cache_invalidated_by_signals(self):
+        """Кэш лент сбрасывается при изменении постов и подписок."""
+        Follow.objects.create(user=self.user2, author=self.user)
+        feeds = {
+            reverse('posts:index'): self.guest_client,
+            reverse('posts:follow_index'): self.auth_client,
+            reverse('posts:group_list', kwargs={'slug': GROUP_SLUG}):
+                self.guest_client,
+            reverse('posts:profile', kwargs={'username': TEST_USERNAME}):
+                self.guest_client,
+        }
+        for url, client in feeds.items():
+            client.get(url)
+        post = Post.objects.create(
+            author=self.user,
+            text=POST_CACHE_TEXT,
+            group=self.group,
+        )
+        for url, client in feeds.items():
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), POST_CACHE_TEXT)
+        post.delete()
+        for url, client in feeds.items():
+            with self.subTest(url=url):
+                self.assertNotContains(client.get(url), POST_CACHE_TEXT)
+
+    def test_versions_bumped_after_commit(self):
+        """Версии лент меняются только после коммита транзакции."""
+        version = get_version('index')
+        with mock.patch.object(transaction, 'on_commit') as on_commit:
+            Post.objects.create(author=self.user, text=POST_CACHE_TEXT)
+            self.assertEqual(get_version('index'), version)
+        for call in on_commit.call_args_list:
+            call[0][0]()
+        self.assertNotEqual(get_version('index'), version)
+
+    def test_feed_cache_invalidated_by_group_change(self):
+        """Смена адреса группы сбрасывает кэш профиля и подписок."""
+        Follow.objects.create(user=self.user2, author=self.user)
+        feeds = {
+            reverse('posts:follow_index'): self.auth_client,
+            reverse('posts:profile', kwargs={'username': TEST_USERNAME}):
+                self.guest_client,
+        }
+        for url, client in feeds.items():
+            client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = GROUP_RENAMED_SLUG
+        group.save()
+        renamed_url = reverse(
+            'posts:group_list', kwargs={'slug': GROUP_RENAMED_SLUG})
+        for url, client in feeds.items():
+            with self.subTest(url=url):
+                self.assertContains(client.get(url), renamed_url)
+
+    def test_feed_cache_invalidated_by_author_name(self):
+        """Смена имени автора сбрасывает кэш лент с его постами."""
+        Follow.objects.create(user=self.user2, author=self.user)
+        feeds = {
+            reverse('posts:index'): self.guest_client,
+            reverse('posts:follow_index'): self.auth_client,
+            reverse('posts:group_list', kwargs={'slug': GROUP_SLUG}):
+                self.guest_client,
+            reverse('posts:profile', kwargs={'username': TEST_USERNAME}):
+                self.guest_client,
+            reverse('posts:post_detail', kwargs={'post_id': self.post1.pk}):
+                self.guest_client,
+        }
+        for url, client in feeds.items():
+            client.get(url)
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = AUTHOR_FIRST_NAME
+        user.last_name = AUTHOR_LAST_NAME
+        user.save()
+        for url, client in feeds.items():
+            with self.subTest(url=url):
+                self.assertContains(
+                    client.get(url),
+                    f'{AUTHOR_FIRST_NAME} {AUTHOR_LAST_NAME}')
+
+    def test_follow_cache_not_shared_between_users(self):
+        """Кэш ленты подписок не отдаётся другому пользователю."""
+        Follow.objects.create(user=self.user2, author=self.user)
+        self.assertContains(
+            self.auth_client.get(reverse('posts:follow_index')), POST_TEXT)
+        self.assertNotContains(
+            self.auth_client_notfollow.get(reverse('posts:follow_index')),
+            POST_TEXT
+        )
+
+    def test_cached_fragment_skips_feed_query(self):
+        """Лента из кэша фрагментов не выбирает посты из базы."""
+        Follow.objects.create(user=self.user2, author=self.user)
+        feeds = {
+            reverse('posts:index'): self.guest_client,
+            reverse('posts:follow_index'): self.auth_client,
+        }
+        for url, client in feeds.items():
+            with self.subTest(url=url):
+                client.get(url)
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertContains(client.get(url), POST_TEXT)
+                self.assertFalse(
+                    any('posts_post"."text' in query['sql']
+                        for query in queries))
+
+    def test_numbered_and_cursor_pages_cached_apart(self):
+        """Первая страница по номеру и по курсору кэшируется отдельно."""
+        url = reverse('posts:index')
+        self.assertContains(self.guest_client.get(url), '?cursor=')
+        numbered = self.guest_client.get(url, {'page': 1})
+        self.assertContains(numbered, '?page=2')
+        self.assertNotContains(numbered, '?cursor=')
+
+    def test_conditional_get_not_modified(self):
+        """Неизменённые страницы отдают 304 без запросов постов."""
+        pages = {
+            reverse('posts:index'): self.guest_client,
+            reverse('posts:group_list', kwargs={'slug': GROUP_SLUG}):
+                self.guest_client,
+            reverse('posts:profile', kwargs={'username': TEST_USERNAME}):
+                self.auth_client,
+            reverse('posts:post_detail', kwargs={'post_id': self.post1.id}):
+                self.auth_client,
+        }
+        for url, client in pages.items():
+            with self.subTest(url=url):
+                etag = client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(
+                    any('posts_post"."text' in query['sql']
+                        for query in queries))
+                Comment.objects.create(
+                    post=self.post1, author=self.user, text=POST_NEW_TEXT)
+                Post.objects.create(
+                    author=self.user, text=POST_CACHE_TEXT, group=self.group)
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+
+    def test_conditional_get_after_login(self):
+        """После повторного входа страница с формой не отдаёт 304."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post1.id})
+        etag = self.auth_client.get(url)['ETag']
+        response = self.auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.auth_client.logout()
+        self.auth_client.force_login(self.user2)
+        response = self.auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_conditional_get_per_user_and_page(self):
+        """ETag различается для пользователей и страниц ленты."""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        self.assertNotEqual(self.auth_client.get(url)['ETag'], etag)
+        self.assertNotEqual(
+            self.guest_client.get(url, {'page': 2})['ETag'], etag)
+
+    def test_conditional_get_last_modified(self):
+        """Анонимам отдаётся Last-Modified, учитывающий правки."""
+        url = reverse('posts:index')
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(
+            self.auth_client.get(url).has_header('Last-Modified'))
+        with mock.patch('posts.cache.time.time',
+                        return_value=time.time() + 60):
+            Post.objects.filter(pk=self.post1.pk).first().save()
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(PAGE_CACHE_ENABLED=True)
+    def test_anonymous_page_cache(self):
+        """Анонимы получают страницы из кэша до изменения их тегов."""
+        pages = {
+            reverse('posts:index'): lambda: Post.objects.create(
+                author=self.user2, text=POST_CACHE_TEXT),
+            reverse('posts:group_list', kwargs={'slug': GROUP_SLUG}):
+                lambda: Post.objects.create(
+                    author=self.user2, text=POST_CACHE_TEXT,
+                    group=self.group),
+            reverse('posts:profile', kwargs={'username': TEST_USERNAME}):
+                lambda: Post.objects.create(
+                    author=self.user, text=POST_CACHE_TEXT),
+            reverse('posts:post_detail', kwargs={'post_id': self.post1.id}):
+                lambda: Comment.objects.create(
+                    post=self.post1, author=self.user2,
+                    text=POST_CACHE_TEXT),
+        }
+        for url, change in pages.items():
+            with self.subTest(url=url):
+                self.assertNotContains(self.guest_client.get(url),
+                                       POST_CACHE_TEXT)
+                hits = middleware.stats()['hits']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(url)
+                self.assertEqual(len(queries), 0)
+                self.assertIsNone(response.context)
+                self.assertEqual(middleware.stats()['hits'], hits + 1)
+                change()
+                self.assertContains(self.guest_client.get(url),
+                                    POST_CACHE_TEXT)
+                Post.objects.filter(text=POST_CACHE_TEXT).delete()
+                Comment.objects.filter(text=POST_CACHE_TEXT).delete()
+
+    @override_settings(PAGE_CACHE_ENABLED=True)
+    def test_page_cache_skips_sessions_and_params(self):
+        """Страницы с сессией и посторонними параметрами не кэшируются."""
+        url = reverse('posts:index')
+        for client, params in ((self.auth_client, {}),
+                               (self.guest_client, {'utm': 1})):
+            with self.subTest(params=params):
+                client.get(url, params)
+                self.assertIsNotNone(client.get(url, params).context)
+
+    @override_settings(PAGE_CACHE_ENABLED=True)
+    def test_page_cache_keyed_by_opened_page(self):
+        """Негодные курсоры и номера страниц не заводят записей в кэше."""
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+        self.guest_client.get(url, {'page': 1})
+        self.guest_client.get(url, {'page': 99})
+        cached = {
+            'cursor': ['a1', 'a2', ''],
+            'page': ['x', '2'],
+        }
+        for name, values in cached.items():
+            for value in values:
+                with self.subTest(**{name: value}):
+                    response = self.guest_client.get(url, {name: value})
+                    self.assertIsNone(response.context)
+        for cursor in ('a1', 'a2'):
+            with self.subTest(cursor=cursor):
+                response = self.auth_client.get(url, {'cursor': cursor})
+                self.assertIsNone(response.context['page_obj'].cursor)
+
     def test_follow_user(self):
         """Проверяем оформление подписки на автора."""
         author = self.user
@@ -346,6 +691,31 @@ class PostPagesTests(TestCase):
         page_context = response.context['page_obj'][0]
         self.assertEqual(page_context.text, self.post1.text)
 
+    def test_follow_index_materialized_feed(self):
+        """Лента подписок обновляется при публикации и восстанавливается."""
+        Follow.objects.create(user=self.user2, author=self.user)
+        self.assertEqual(self.user2.feed.count(), ALL_POSTS_COUNT)
+        new_post = Post.objects.create(author=self.user, text=POST_NEW_TEXT)
+        response = self.auth_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], new_post)
+        FeedEntry.objects.all().delete()
+        call_command('backfill_feed', stdout=StringIO())
+        self.assertEqual(self.user2.feed.count(), ALL_POSTS_COUNT + 1)
+        self.assertFalse(self.user3.feed.exists())
+
+    def test_backfill_refreshes_cached_feed(self):
+        """Перестроенная лента подписок не берётся из старого кэша."""
+        Follow.objects.create(user=self.user2, author=self.user)
+        url = reverse('posts:follow_index')
+        for args in ([], ['--user', str(self.user2.pk)]):
+            with self.subTest(args=args):
+                self.auth_client.get(url)
+                Post.objects.bulk_create(
+                    [Post(author=self.user, text=POST_CACHE_TEXT)])
+                call_command('backfill_feed', *args, stdout=StringIO())
+                self.assertContains(self.auth_client.get(url), POST_CACHE_TEXT)
+                Post.objects.filter(text=POST_CACHE_TEXT).delete()
+
     def test_notfollow_index_user(self):
         """Проверяем отсутствие постов в ленте, если не подписан."""
         author = self.user
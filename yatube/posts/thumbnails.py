@@ -0,0 +1,99 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.templatetags.static import static
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import DummyImageFile, ImageFile
+
+from .cache import bump_post
+from .feed import bump_followers
+from .models import Post
+
+SCHEDULED_PREFIX: str = 'thumbnail-scheduled'
+# Через столько секунд недостающая миниатюра заказывается снова,
+# например если её задача не выполнилась
+SCHEDULED_TIMEOUT: int = 600
+
+
+class PlaceholderImageFile(DummyImageFile):
+    """Заглушка, которая показывается, пока миниатюра готовится в фоне."""
+
+    @property
+    def url(self):
+        return static(settings.THUMBNAIL_PLACEHOLDER)
+
+
+class DeferredThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, который не декодирует картинки в запросе.
+
+    Готовая миниатюра берётся из key-value хранилища, а недостающая
+    ставится в очередь задач, и до её появления отдаётся заглушка.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not settings.THUMBNAIL_ASYNC or not file_:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        source = ImageFile(file_)
+        name = self._get_thumbnail_filename(
+            source, geometry_string, self.full_options(source, options))
+        cached = default.kvstore.get(ImageFile(name, default.storage))
+        if cached:
+            return cached
+        schedule(source.name, geometry_string, options)
+        return PlaceholderImageFile(geometry_string)
+
+    def full_options(self, source, options):
+        """Дополняет опции так же, как ThumbnailBackend.get_thumbnail."""
+        options = dict(options)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        return options
+
+
+def generate(name, geometry_string, options):
+    """Синхронно создаёт миниатюру и записывает её в key-value хранилище.
+
+    Страницы, отрисованные с заглушкой, лежат в кэше, поэтому постам
+    с этой картинкой выдаются новые версии.
+    """
+    ThumbnailBackend().get_thumbnail(name, geometry_string, **options)
+    posts = Post.objects.filter(image=name).only('author_id', 'group_id')
+    for post in posts:
+        bump_post(post)
+        bump_followers(post.author_id)
+
+
+def schedule(name, geometry_string, options):
+    """Заказывает миниатюру в очереди задач.
+
+    Страницы вызывают это при каждом показе заглушки, поэтому заказ
+    запоминается в кэше и повторный показ не обращается к базе.
+    """
+    if not settings.THUMBNAIL_ASYNC:
+        return generate(name, geometry_string, options)
+    from .tasks import generate_thumbnail
+    key = hashlib.md5(
+        f'{name}:{geometry_string}:{sorted(options.items())}'.encode()
+    ).hexdigest()
+    if not cache.add(f'{SCHEDULED_PREFIX}:{key}', 1, SCHEDULED_TIMEOUT):
+        return None
+    return generate_thumbnail.enqueue(
+        (name, geometry_string, options), key=key)
+
+
+def schedule_presets(name):
+    """Заказывает все миниатюры, которые шаблоны строят для картинки."""
+    return [
+        schedule(name, geometry_string, options)
+        for geometry_string, options in settings.THUMBNAIL_PRESETS
+    ]
@@ -0,0 +1,234 @@
+"""Потоковый импорт и экспорт записей в JSON Lines и CSV.
+
+Записи читаются и пишутся по одной, а в базу попадают пачками через
+bulk_create, поэтому память не зависит от размера файла. Сигналы при
+bulk_create не срабатывают: счётчики, ленты и поисковый индекс
+пересчитываются один раз в конце импорта.
+"""
+import csv
+import json
+import os
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import cache, counters, feed, search
+from .models import Comment, Follow, Group, Post, User
+
+FORMATS = ('jsonl', 'csv')
+BATCH_SIZE: int = 1000
+
+
+class TransferError(Exception):
+    pass
+
+
+class Table:
+    """Поля модели в файле: связи записаны именами, а не ключами."""
+
+    def __init__(self, model, fields, refs=None, dates=(),
+                 ignore_conflicts=False):
+        self.model = model
+        self.fields = fields
+        # Поле файла -> (модель, поле с естественным ключом)
+        self.refs = refs or {}
+        self.dates = dates
+        self.ignore_conflicts = ignore_conflicts
+
+    def export_rows(self):
+        columns = [
+            f'{field}__{self.refs[field][1]}' if field in self.refs
+            else field for field in self.fields
+        ]
+        rows = self.model.objects.order_by('pk').values_list(*columns)
+        for values in rows.iterator(chunk_size=BATCH_SIZE):
+            yield {
+                field: export_value(value)
+                for field, value in zip(self.fields, values)
+            }
+
+    def build(self, rows, create_users=False):
+        keys = {
+            field: resolve(model, key, {
+                row[field] for _, row in rows if row.get(field)
+            }, create=create_users and model is User)
+            for field, (model, key) in self.refs.items()
+        }
+        return [self.build_one(line, row, keys) for line, row in rows]
+
+    def build_one(self, line, row, keys):
+        values = {}
+        for field in self.fields:
+            value = row.get(field)
+            if value in (None, ''):
+                if field in self.refs and not self.model._meta.get_field(
+                        field).null:
+                    raise TransferError(f'Строка {line}: нет поля {field}')
+                if field in self.dates:
+                    values[field] = timezone.now()
+                continue
+            if field in self.refs:
+                if value not in keys[field]:
+                    raise TransferError(
+                        f'Строка {line}: {field} {value!r} не найден')
+                values[f'{field}_id'] = keys[field][value]
+            elif field in self.dates:
+                values[field] = import_date(line, value)
+            elif field in ('id', 'post'):
+                values[self.model._meta.get_field(field).attname] = (
+                    import_int(line, field, value))
+            else:
+                values[field] = value
+        return self.model(**values)
+
+
+TABLES = {
+    'groups': Table(Group, ('id', 'title', 'slug', 'description')),
+    'posts': Table(
+        Post, ('id', 'text', 'pub_date', 'author', 'group', 'image'),
+        refs={'author': (User, 'username'), 'group': (Group, 'slug')},
+        dates=('pub_date',),
+    ),
+    'comments': Table(
+        Comment, ('id', 'post', 'author', 'text', 'created'),
+        refs={'author': (User, 'username')},
+        dates=('created',),
+    ),
+    'follows': Table(
+        Follow, ('user', 'author'),
+        refs={'user': (User, 'username'), 'author': (User, 'username')},
+        ignore_conflicts=True,
+    ),
+}
+
+
+def export_value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def import_int(line, field, value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise TransferError(f'Строка {line}: неверное {field} {value!r}')
+
+
+def import_date(line, value):
+    date = parse_datetime(value)
+    if date is None:
+        raise TransferError(f'Строка {line}: неверная дата {value!r}')
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def resolve(model, field, values, create=False):
+    """Ключи объектов по естественным ключам values."""
+    found = dict(model.objects.filter(
+        **{f'{field}__in': values}).values_list(field, 'pk'))
+    missing = values - found.keys()
+    if create and missing:
+        # Авторы из архива получают аккаунты без пароля.
+        model.objects.bulk_create(
+            [model(**{field: value, 'password': make_password(None)})
+             for value in missing],
+            ignore_conflicts=True,
+        )
+        found.update(model.objects.filter(
+            **{f'{field}__in': missing}).values_list(field, 'pk'))
+    return found
+
+
+def guess_format(path):
+    extension = os.path.splitext(path)[1].lstrip('.').lower()
+    if extension == 'json':
+        return 'jsonl'
+    if extension not in FORMATS:
+        raise TransferError('Укажите формат файла через --format')
+    return extension
+
+
+def read_rows(file, format):
+    """Строки файла по одной в виде словарей с номером строки."""
+    if format == 'csv':
+        # Первая строка CSV — заголовок.
+        yield from enumerate(csv.DictReader(file), 2)
+        return
+    for line, text in enumerate(file, 1):
+        if not text.strip():
+            continue
+        try:
+            yield line, json.loads(text)
+        except ValueError as error:
+            raise TransferError(f'Строка {line}: {error}')
+
+
+def write_rows(file, format, fields, rows):
+    writer = csv.DictWriter(file, fields) if format == 'csv' else None
+    if writer:
+        writer.writeheader()
+    for number, row in enumerate(rows, 1):
+        if writer:
+            writer.writerow(row)
+        else:
+            file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        yield number
+
+
+def batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Позволяет bulk_create записать свои даты в поля auto_now_add."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def import_rows(table, rows, batch_size=BATCH_SIZE, create_users=False,
+                skip_existing=False):
+    """Записывает строки пачками и возвращает число записанных по ходу."""
+    dates = [table.model._meta.get_field(field) for field in table.dates]
+    total = 0
+    with explicit_dates(*dates):
+        for batch in batches(rows, batch_size):
+            objects = table.build(batch, create_users)
+            table.model.objects.bulk_create(
+                objects,
+                ignore_conflicts=table.ignore_conflicts or skip_existing,
+            )
+            total += len(objects)
+            yield total
+    # Ключи из файла не сдвигают последовательность в PostgreSQL.
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+                no_style(), [table.model]):
+            cursor.execute(sql)
+
+
+def finish_import():
+    """Отложенная работа сигналов после bulk_create."""
+    with transaction.atomic():
+        counters.recount()
+    feed.rebuild_all()
+    search.get_backend().index_missing()
+    cache.bump_all()
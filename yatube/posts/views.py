@@ -1,36 +1,73 @@
+from functools import partial
+from http import HTTPStatus
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db import transaction
+from django.http import (Http404, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.http import require_POST
+
+from core.routers import read_from_replica
 
+from . import live
+from .cache import get_version
+from .conditional import (conditional, group_tags, index_tags, post_tags,
+                          profile_tags)
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .notifications import mark_read
+from .models import Comment, Follow, Group, Post, User
+from .paginators import CursorPaginator, LazyList
+from .search import get_backend
+from .thumbnails import schedule_presets
 
 POSTS_ON_PAGE: int = 10
+POSTS_ORDERING = ('-pub_date', '-id')
+FEED_ORDERING = ('-pub_date', '-post_id')
+COMMENTS_ON_PAGE: int = 20
+COMMENTS_ORDERING = ('-created', '-id')
+NOTIFICATIONS_ORDERING = ('-created', '-id')
 
 
+@read_from_replica
+@conditional(index_tags)
 def index(request):
-    posts = Post.objects.select_related('author', 'group').all()
+    posts = Post.objects.select_related('author', 'group')
     page_obj = get_paginator(request, posts)
     context = {
         'page_obj': page_obj,
+        'live_url': partial(live_url, request, page_obj, 'index'),
+        **feed_cache(get_version('index')),
     }
     return render(request, 'posts/index.html', context)
 
 
+@read_from_replica
+@conditional(group_tags)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.select_related('author')
     page_obj = get_paginator(request, posts)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'live_url': partial(
+            live_url, request, page_obj, 'group', group=slug),
+        **feed_cache(get_version('group', group.pk)),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@read_from_replica
+@conditional(profile_tags)
 def profile(request, username):
-    user_profile = get_object_or_404(User, username=username)
-    posts = user_profile.posts.all()
+    user_profile = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    posts = user_profile.posts.select_related('group')
     page_obj = get_paginator(request, posts)
     following = request.user.is_authenticated and (
         Follow.objects.filter(user=request.user, author=user_profile).exists())
@@ -38,14 +75,30 @@ def profile(request, username):
         'page_obj': page_obj,
         'user_profile': user_profile,
         'following': following,
+        **feed_cache(get_version('profile', user_profile.pk)),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    results = get_backend().search(query) if query else []
+    paginator = Paginator(results, POSTS_ON_PAGE)
+    context = {
+        'query': query,
+        'page_obj': paginator.get_page(request.GET.get('page')),
+        'page_query': f"{urlencode({'q': query})}&",
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@read_from_replica
+@conditional(post_tags, forms=True)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id)
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = get_comments_page(post.id, None)
     context = {
         'post': post,
         'form': form,
@@ -54,6 +107,37 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    comments = get_comments_page(post.id, request.GET.get('cursor'))
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.id,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.next_cursor(),
+        })
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+def get_comments_page(post_id, cursor):
+    comments = Comment.objects.filter(
+        post_id=post_id).select_related('author')
+    paginator = CursorPaginator(
+        comments, COMMENTS_ON_PAGE, ordering=COMMENTS_ORDERING)
+    return paginator.get_page(cursor)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -64,6 +148,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        prepare_thumbnails(post)
         return redirect('posts:profile', request.user)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -79,6 +164,8 @@ def post_edit(request, post_id):
         instance=post or None)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            prepare_thumbnails(post)
         return redirect('posts:post_detail', post_id)
     form = PostForm(instance=post)
     context = {
@@ -89,10 +176,51 @@ def post_edit(request, post_id):
     return render(request, 'posts/create_post.html', context)
 
 
-def get_paginator(request, posts):
-    paginator = Paginator(posts, POSTS_ON_PAGE)
+def prepare_thumbnails(post):
+    if post.image:
+        name = post.image.name
+        transaction.on_commit(lambda: schedule_presets(name))
+
+
+def get_paginator(request, posts, ordering=POSTS_ORDERING):
+    """Страница ленты по номеру или курсору.
+
+    Параметры открытой страницы запоминаются в request.page_params: под
+    ними кэш страниц сохраняет ответ, сколько бы разных негодных номеров
+    и курсоров ни приходило.
+    """
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    if page_number is not None:
+        paginator = Paginator(posts.order_by(*ordering), POSTS_ON_PAGE)
+        page_obj = paginator.get_page(page_number)
+        request.page_params = {'page': page_obj.number}
+        return page_obj
+    paginator = CursorPaginator(posts, POSTS_ON_PAGE, ordering=ordering)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
+    request.page_params = (
+        {'cursor': page_obj.cursor} if page_obj.cursor else {})
+    return page_obj
+
+
+def live_url(request, page_obj, feed, **params):
+    """Адрес живых обновлений для первой страницы ленты.
+
+    Вьюхи передают его в шаблон через partial: записи страницы читаются,
+    только если фрагмент с ними не нашёлся в кэше.
+    """
+    if not settings.LIVE_UPDATES_ENABLED or (
+            'page' in request.GET or 'cursor' in request.GET):
+        return None
+    since = max((post.pk for post in page_obj), default=0)
+    path = reverse('posts:live_updates', args=[feed])
+    return f'{path}?{urlencode({**params, "since": since})}'
+
+
+def feed_cache(version):
+    return {
+        'feed_version': version,
+        'feed_cache_timeout': settings.FEED_CACHE_TIMEOUT,
+    }
 
 
 @login_required
@@ -107,13 +235,17 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@read_from_replica
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_paginator(request, posts)
+    entries = request.user.feed.select_related('post__author', 'post__group')
+    page_obj = get_paginator(request, entries, ordering=FEED_ORDERING)
+    entries = page_obj.object_list
+    page_obj.object_list = LazyList(lambda: [entry.post for entry in entries])
     context = {
-        'posts': posts,
         'page_obj': page_obj,
+        'live_url': partial(live_url, request, page_obj, 'follow'),
+        **feed_cache(get_version('follow', request.user.pk)),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -134,3 +266,61 @@ def profile_unfollow(request, username):
     follow = Follow.objects.filter(user=user, author=author)
     follow.delete()
     return redirect('posts:profile', username=username)
+
+
+@login_required
+def notifications(request):
+    notifications = request.user.notifications.select_related(
+        'post__author', 'post__group')
+    page_obj = get_paginator(
+        request, notifications, ordering=NOTIFICATIONS_ORDERING)
+    return render(request, 'posts/notifications.html', {'page_obj': page_obj})
+
+
+@require_POST
+@login_required
+def notifications_read(request):
+    mark_read(request.user.pk)
+    return redirect('posts:notifications')
+
+
+@read_from_replica
+def live_updates(request, feed):
+    """Число постов ленты новее since: потоком SSE или долгим опросом.
+
+    Без LIVE_UPDATES_ENABLED опрос получает число сразу, не занимая
+    поток, а поток — ответ 204, после которого EventSource страницы из
+    старого кэша не переподключается.
+    """
+    live_feed = get_live_feed(request, feed)
+    try:
+        since = int(request.GET['since'])
+    except (KeyError, ValueError):
+        since = live_feed.latest()
+    event_stream = 'text/event-stream' in request.META.get('HTTP_ACCEPT', '')
+    if not settings.LIVE_UPDATES_ENABLED:
+        if event_stream:
+            return HttpResponse(status=HTTPStatus.NO_CONTENT)
+        return JsonResponse(
+            {'count': live_feed.count_new(since), 'since': since})
+    request.long_running = True
+    if event_stream:
+        response = StreamingHttpResponse(
+            live.stream(live_feed, since), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Иначе nginx копит события в буфере.
+        response['X-Accel-Buffering'] = 'no'
+        return response
+    count = live.poll(live_feed, since, settings.LIVE_LONG_POLL_SECONDS)
+    return JsonResponse({'count': count, 'since': since})
+
+
+def get_live_feed(request, feed):
+    if feed == 'index':
+        return live.index_feed()
+    if feed == 'group':
+        group = get_object_or_404(Group, slug=request.GET.get('group'))
+        return live.group_feed(group.pk)
+    if feed == 'follow' and request.user.is_authenticated:
+        return live.FollowFeed(request.user.pk)
+    raise Http404
@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import Email, Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk', 'name', 'status', 'priority', 'attempts', 'run_at', 'locked_by')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key', 'last_error')
+
+
+@admin.register(Email)
+class EmailAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'recipients', 'status', 'attempts', 'send_after')
+    list_filter = ('status',)
+    search_fields = ('recipients', 'last_error')
@@ -0,0 +1,12 @@
+from django.apps import AppConfig
+
+
+class TasksConfig(AppConfig):
+    name = 'tasks'
+
+    def ready(self):
+        from django.utils.module_loading import autodiscover_modules
+
+        from . import mail  # noqa: F401
+        # Задачи приложений объявляются в их модулях tasks.py.
+        autodiscover_modules('tasks')
@@ -0,0 +1,132 @@
+"""Исходящая почта через очередь.
+
+QueuedEmailBackend только записывает письма в таблицу Email и ставит
+задачу flush_outbox. Задача отправляет письма пачками по
+EMAIL_BATCH_SIZE через одно соединение TASKS_EMAIL_BACKEND, а письма,
+которые не удалось отправить, откладывает с растущей паузой.
+"""
+import json
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import Email
+from .queue import task
+
+OUTBOX_KEY: str = 'outbox'
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Кладёт письма в очередь вместо отправки в запросе.
+
+    Вложения не поддерживаются: письма сайта их не содержат.
+    """
+
+    def send_messages(self, email_messages):
+        Email.objects.bulk_create([
+            Email(
+                message=json.dumps(serialize(message)),
+                recipients=', '.join(message.recipients()),
+            )
+            for message in email_messages
+        ])
+        if email_messages:
+            flush_outbox.enqueue(key=OUTBOX_KEY)
+        return len(email_messages)
+
+
+def serialize(message):
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+    }
+
+
+def claim_batch():
+    """Забирает пачку писем, готовых к отправке."""
+    candidates = list(Email.objects.filter(
+        status=Email.QUEUED, send_after__lte=timezone.now()
+    ).values_list('pk', flat=True)[:settings.EMAIL_BATCH_SIZE])
+    # Время взятия в отправку хранится в send_after.
+    claimed = [
+        pk for pk in candidates
+        if Email.objects.filter(pk=pk, status=Email.QUEUED).update(
+            status=Email.SENDING, send_after=timezone.now())
+    ]
+    return list(Email.objects.filter(pk__in=claimed))
+
+
+def send_batch(emails):
+    """Отправляет письма через одно соединение; возвращает число ошибок."""
+    connection = get_connection(settings.TASKS_EMAIL_BACKEND)
+    failed = 0
+    try:
+        connection.open()
+        for email in emails:
+            message = EmailMultiAlternatives(**json.loads(email.message))
+            try:
+                connection.send_messages([message])
+            except Exception:
+                failed += 1
+                postpone(email, traceback.format_exc())
+                # После ошибки сервер мог закрыть соединение.
+                connection.close()
+                connection.open()
+            else:
+                email.delete()
+    except Exception:
+        error = traceback.format_exc()
+        for email in Email.objects.filter(
+                pk__in=[email.pk for email in emails],
+                status=Email.SENDING):
+            failed += 1
+            postpone(email, error)
+    finally:
+        connection.close()
+    return failed
+
+
+def postpone(email, error):
+    email.attempts += 1
+    email.last_error = error
+    if email.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+        email.status = Email.FAILED
+    else:
+        email.status = Email.QUEUED
+        email.send_after = timezone.now() + timedelta(
+            seconds=settings.EMAIL_RETRY_DELAY * 2 ** (email.attempts - 1))
+    email.save(update_fields=[
+        'attempts', 'last_error', 'status', 'send_after'])
+
+
+@task(priority=10)
+def flush_outbox():
+    """Отправляет все готовые письма и планирует себя на повторы."""
+    # Письма воркера, пропавшего посреди отправки, уходят снова.
+    Email.objects.filter(
+        status=Email.SENDING,
+        send_after__lt=timezone.now() - timedelta(
+            seconds=settings.TASKS_LOCK_TIMEOUT),
+    ).update(status=Email.QUEUED)
+    while True:
+        emails = claim_batch()
+        if not emails:
+            break
+        send_batch(emails)
+    retry = Email.objects.filter(status=Email.QUEUED).aggregate(
+        send_after=Min('send_after'))['send_after']
+    if retry is not None:
+        countdown = (retry - timezone.now()).total_seconds()
+        flush_outbox.enqueue(key=OUTBOX_KEY, countdown=max(countdown, 0))
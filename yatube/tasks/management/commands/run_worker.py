@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи из очереди в пуле процессов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.TASKS_PROCESSES,
+            help='0 — выполнять задачи в самом воркере',
+        )
+        parser.add_argument('--poll', type=float, default=1.0)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='выполнить готовые задачи и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(options['processes'], options['poll'])
+        self.stdout.write(f'Воркер {worker.name} запущен')
+        try:
+            executed = worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            return
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано задач: {executed}'))
@@ -0,0 +1,36 @@
+from email import message_from_bytes, policy
+
+from django.core.management.base import BaseCommand
+
+from tasks.smtp import DebuggingSMTPServer
+
+
+class Command(BaseCommand):
+    help = (
+        'Запускает локальный SMTP-сервер, который печатает полученные '
+        'письма вместо отправки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1025)
+
+    def handle(self, *args, **options):
+        command = self
+
+        class Server(DebuggingSMTPServer):
+            def receive(self, sender, recipients, data):
+                message = message_from_bytes(data, policy=policy.default)
+                command.stdout.write(
+                    f"{sender} -> {', '.join(recipients)}: "
+                    f"{message['Subject']}")
+
+        server = Server(options['host'], options['port'])
+        self.stdout.write(
+            f"SMTP-сервер слушает {options['host']}:{server.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0002_auto_20261018_1940'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'queued'), models.Q(_negated=True, key='')), fields=('name', 'key'), name='task_queued_key_unique'),
+        ),
+    ]
@@ -0,0 +1,107 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Отложенный вызов функции, объявленной через tasks.queue.task.
+
+    Выполненные задачи удаляются, а исчерпавшие попытки остаются со
+    статусом FAILED и текстом последней ошибки.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Не выполнена'),
+    )
+
+    name = models.CharField('Функция', max_length=200)
+    payload = models.TextField('Аргументы в JSON', default='{}')
+    key = models.CharField(
+        'Ключ',
+        max_length=255,
+        blank=True,
+        help_text='Пока задача с ключом ждёт очереди, такая же не ставится'
+    )
+    priority = models.IntegerField('Приоритет', default=0)
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    attempts = models.PositiveIntegerField('Попытки', default=0)
+    max_attempts = models.PositiveIntegerField('Число попыток', default=3)
+    run_at = models.DateTimeField('Выполнить после', default=timezone.now)
+    locked_by = models.CharField('Воркер', max_length=100, blank=True)
+    locked_at = models.DateTimeField('Взята в работу', blank=True, null=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+
+    class Meta:
+        ordering = ['-priority', 'run_at', 'id']
+        indexes = [
+            models.Index(
+                fields=['status', '-priority', 'run_at'],
+                name='task_queue_idx'
+            ),
+            models.Index(fields=['key'], name='task_key_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'key'],
+                condition=models.Q(status='queued') & ~models.Q(key=''),
+                name='task_queued_key_unique'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.name} ({self.get_status_display()})'
+
+
+class Email(models.Model):
+    """Письмо в очереди на отправку.
+
+    Отправленные письма удаляются, а исчерпавшие попытки остаются со
+    статусом FAILED и текстом последней ошибки.
+    """
+    QUEUED = 'queued'
+    SENDING = 'sending'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'Ждёт отправки'),
+        (SENDING, 'Отправляется'),
+        (FAILED, 'Не отправлено'),
+    )
+
+    message = models.TextField('Письмо в JSON')
+    recipients = models.TextField('Получатели')
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    attempts = models.PositiveIntegerField('Попытки', default=0)
+    send_after = models.DateTimeField(
+        'Отправить после',
+        default=timezone.now
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Создано', auto_now_add=True)
+
+    class Meta:
+        ordering = ['send_after', 'id']
+        verbose_name = 'письмо'
+        verbose_name_plural = 'исходящие письма'
+        indexes = [
+            models.Index(
+                fields=['status', 'send_after'],
+                name='email_outbox_idx'
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.recipients} ({self.get_status_display()})'
@@ -0,0 +1,73 @@
+"""Очередь задач в базе данных.
+
+Функция, помеченная декоратором task, ставится в очередь вызовом
+delay() и выполняется воркером из команды run_worker. Аргументы
+хранятся в JSON, поэтому передавать нужно ключи и имена, а не объекты.
+Задача, созданная внутри транзакции, появится у воркера только вместе
+с её данными.
+"""
+import json
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Task
+
+registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name, priority, max_attempts, retry_delay):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.enqueue(args, kwargs)
+
+    def enqueue(self, args=(), kwargs=None, key='', priority=None,
+                countdown=0):
+        """Ставит вызов в очередь; с key — только если такого ещё нет.
+
+        Одновременную постановку двух задач с одним ключом отсекает
+        уникальное ограничение таблицы.
+        """
+        if key and Task.objects.filter(
+                name=self.name, key=key, status=Task.QUEUED).exists():
+            return None
+        try:
+            with transaction.atomic():
+                return Task.objects.create(
+                    name=self.name,
+                    payload=json.dumps(
+                        {'args': list(args), 'kwargs': kwargs or {}}),
+                    key=key,
+                    priority=self.priority if priority is None else priority,
+                    max_attempts=self.max_attempts,
+                    run_at=timezone.now() + timedelta(seconds=countdown),
+                )
+        except IntegrityError:
+            if not key:
+                raise
+            return None
+
+    def retry_at(self, attempts):
+        """Момент повтора: пауза удваивается с каждой попыткой."""
+        return timezone.now() + timedelta(
+            seconds=self.retry_delay * 2 ** (attempts - 1))
+
+
+def task(priority=0, max_attempts=3, retry_delay=10):
+    """Регистрирует функцию как задачу очереди."""
+    def decorator(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+        registry[name] = TaskFunction(
+            func, name, priority, max_attempts, retry_delay)
+        return registry[name]
+    return decorator
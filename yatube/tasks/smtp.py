@@ -0,0 +1,111 @@
+"""Локальный SMTP-сервер для разработки и тестов.
+
+Понимает ровно столько SMTP, сколько нужно smtplib: принимает письма
+без авторизации и шифрования и складывает их в messages, никуда не
+пересылая. Адреса из refused сервер отклоняет, что позволяет проверить
+повторную отправку.
+"""
+import socketserver
+import threading
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        self.reset()
+        self.reply('220 localhost yatube debugging SMTP')
+        for raw in self.rfile:
+            command = raw.decode('utf-8', 'replace').rstrip('\r\n')
+            verb = command[:4].lower()
+            handler = getattr(self, f'smtp_{verb}', None)
+            if handler is None:
+                self.reply('502 Command not implemented')
+            elif handler(command) is False:
+                return
+
+    def reset(self):
+        self.sender, self.recipients = None, []
+
+    def smtp_ehlo(self, command):
+        self.reply('250-localhost')
+        self.reply('250 8BITMIME')
+
+    def smtp_helo(self, command):
+        self.reply('250 localhost')
+
+    def smtp_mail(self, command):
+        self.reset()
+        self.sender = address(command)
+        self.reply('250 OK')
+
+    def smtp_rcpt(self, command):
+        recipient = address(command)
+        if recipient in self.server.refused:
+            self.reply('550 Mailbox unavailable')
+            return
+        self.recipients.append(recipient)
+        self.reply('250 OK')
+
+    def smtp_data(self, command):
+        self.reply('354 End data with <CR><LF>.<CR><LF>')
+        self.server.receive(self.sender, self.recipients, self.read_data())
+        self.reset()
+        self.reply('250 OK: queued')
+
+    def smtp_rset(self, command):
+        self.reset()
+        self.reply('250 OK')
+
+    def smtp_noop(self, command):
+        self.reply('250 OK')
+
+    def smtp_quit(self, command):
+        self.reply('221 Bye')
+        return False
+
+    def read_data(self):
+        lines = []
+        for raw in self.rfile:
+            if raw in (b'.\r\n', b'.\n'):
+                break
+            # Точка в начале строки удваивается отправителем.
+            lines.append(raw[1:] if raw.startswith(b'..') else raw)
+        return b''.join(lines)
+
+
+def address(command):
+    _, _, value = command.partition(':')
+    return value.strip().split(' ')[0].strip('<>')
+
+
+class DebuggingSMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), SMTPHandler)
+        self.lock = threading.Lock()
+        self.messages = []
+        self.connections = 0
+        self.refused = set()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def receive(self, sender, recipients, data):
+        with self.lock:
+            self.messages.append((sender, recipients, data))
+
+    def start(self):
+        """Запускает сервер в фоновом потоке."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,172 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import send_mail
+from django.db import connection
+from django.db.models.query import QuerySet
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import User
+from posts.thumbnails import schedule_presets
+
+from .models import Email, Task
+from .queue import task
+from .smtp import DebuggingSMTPServer
+from .worker import Worker, execute, requeue_stale
+
+calls = []
+
+
+@task(priority=1)
+def remember(value):
+    calls.append(value)
+
+
+@task(max_attempts=2, retry_delay=0)
+def fail():
+    raise ValueError('Ошибка задачи')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        cache.clear()
+        self.worker = Worker(processes=0, poll=0)
+
+    def test_priorities(self):
+        """Задачи выполняются по приоритету, а отложенные ждут своего часа."""
+        remember.delay('обычная')
+        remember.enqueue(['срочная'], priority=10)
+        remember.enqueue(['отложенная'], countdown=60)
+        self.assertEqual(self.worker.run(once=True), 2)
+        self.assertEqual(calls, ['срочная', 'обычная'])
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_retries(self):
+        """Упавшая задача повторяется, пока не кончатся попытки."""
+        fail.delay()
+        with self.assertLogs('tasks.worker', 'ERROR') as logs:
+            self.worker.run(once=True)
+        self.assertEqual(len(logs.output), 2)
+        task = Task.objects.get()
+        self.assertEqual(task.status, Task.FAILED)
+        self.assertEqual(task.attempts, 2)
+        self.assertIn('Ошибка задачи', task.last_error)
+
+    def test_unique_key(self):
+        remember.enqueue(['первая'], key='same')
+        self.assertIsNone(remember.enqueue(['вторая'], key='same'))
+        self.worker.run(once=True)
+        self.assertEqual(calls, ['первая'])
+
+    def test_unique_key_race(self):
+        """Дубликат, проскочивший проверку, отсекает ограничение таблицы."""
+        remember.enqueue(['первая'], key='same')
+        with mock.patch.object(QuerySet, 'exists', return_value=False):
+            self.assertIsNone(remember.enqueue(['вторая'], key='same'))
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_retry_with_queued_duplicate(self):
+        """Повтор не нужен, если такая же задача уже ждёт в очереди."""
+        running = fail.enqueue(key='same')
+        Task.objects.update(status=Task.RUNNING)
+        queued = fail.enqueue(key='same')
+        with self.assertLogs('tasks.worker', 'ERROR'):
+            self.assertFalse(execute(running.pk))
+        self.assertEqual(
+            list(Task.objects.values_list('pk', flat=True)), [queued.pk])
+
+    def test_stale_task_requeued(self):
+        remember.delay('потерянная')
+        Task.objects.update(
+            status=Task.RUNNING,
+            locked_at=timezone.now() - timedelta(
+                seconds=settings.TASKS_LOCK_TIMEOUT + 1),
+        )
+        self.assertEqual(requeue_stale(), 1)
+        self.worker.run(once=True)
+        self.assertEqual(calls, ['потерянная'])
+
+    def test_thumbnails_queued_once(self):
+        schedule_presets('posts/small.gif')
+        with CaptureQueriesContext(connection) as queries:
+            schedule_presets('posts/small.gif')
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(
+            Task.objects.count(), len(settings.THUMBNAIL_PRESETS))
+
+
+@override_settings(
+    EMAIL_BACKEND='tasks.mail.QueuedEmailBackend',
+    TASKS_EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+    EMAIL_HOST='127.0.0.1',
+    EMAIL_BATCH_SIZE=2,
+)
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.server = DebuggingSMTPServer().start()
+        self.addCleanup(self.server.stop)
+        settings = self.settings(EMAIL_PORT=self.server.port)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.worker = Worker(processes=0, poll=0)
+
+    def send(self, *recipients):
+        for recipient in recipients:
+            send_mail('Тема', 'Текст', 'yatube@example.com', [recipient])
+
+    def test_password_reset_email_queued(self):
+        """Письма отправляет воркер пачками через одно соединение."""
+        User.objects.create_user(
+            username='auth', email='auth@example.com', password='pass')
+        response = Client().post(
+            reverse('users:password_reset_form'),
+            {'email': 'auth@example.com'},
+        )
+        self.assertRedirects(response, reverse('users:password_reset_done'))
+        self.send('first@example.com', 'second@example.com')
+        self.assertEqual(Email.objects.count(), 3)
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(self.server.messages, [])
+        self.worker.run(once=True)
+        self.assertEqual(
+            sorted(recipients for _, recipients, _ in self.server.messages),
+            [['auth@example.com'], ['first@example.com'],
+             ['second@example.com']],
+        )
+        self.assertEqual(self.server.connections, 2)
+        self.assertFalse(Email.objects.exists())
+        self.assertFalse(Task.objects.exists())
+
+    def test_failed_email_retried(self):
+        """Отклонённое письмо откладывается, остальные уходят."""
+        self.server.refused.add('bad@example.com')
+        self.send('bad@example.com', 'good@example.com')
+        self.worker.run(once=True)
+        self.assertEqual(len(self.server.messages), 1)
+        email = Email.objects.get()
+        self.assertEqual(
+            (email.status, email.attempts), (Email.QUEUED, 1))
+        self.assertIn('SMTPRecipientsRefused', email.last_error)
+        self.assertGreater(email.send_after, timezone.now())
+        self.assertGreaterEqual(Task.objects.get().run_at, email.send_after)
+        self.server.refused.clear()
+        Email.objects.update(send_after=timezone.now())
+        Task.objects.update(run_at=timezone.now())
+        self.worker.run(once=True)
+        self.assertEqual(len(self.server.messages), 2)
+        self.assertFalse(Email.objects.exists())
+
+    @override_settings(EMAIL_MAX_ATTEMPTS=1)
+    def test_server_unavailable(self):
+        self.server.stop()
+        self.send('user@example.com')
+        self.worker.run(once=True)
+        email = Email.objects.get()
+        self.assertEqual(email.status, Email.FAILED)
+        self.assertIn('ConnectionRefusedError', email.last_error)
@@ -0,0 +1,158 @@
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import (IntegrityError, close_old_connections, connections,
+                       transaction)
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+from .queue import registry
+
+logger = logging.getLogger(__name__)
+
+# Как часто воркер возвращает в очередь задачи упавших воркеров
+STALE_CHECK_SECONDS: int = 60
+
+
+def claim(worker, limit):
+    """Забирает до limit готовых задач в порядке приоритета.
+
+    Задачу получает тот, чей UPDATE первым сменил её статус, поэтому
+    несколько воркеров могут работать с одной очередью без блокировок.
+    """
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now
+    ).order_by('-priority', 'run_at', 'pk').values_list(
+        'pk', flat=True)[:limit * 2]
+    claimed = []
+    for pk in candidates:
+        if Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+                status=Task.RUNNING, locked_by=worker, locked_at=now,
+                attempts=F('attempts') + 1):
+            claimed.append(pk)
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def execute(pk):
+    """Выполняет взятую задачу, при ошибке откладывает повтор."""
+    task = Task.objects.get(pk=pk)
+    function = registry.get(task.name)
+    try:
+        if function is None:
+            raise LookupError(f'Неизвестная задача {task.name}')
+        payload = json.loads(task.payload)
+        function(*payload['args'], **payload['kwargs'])
+    except Exception:
+        logger.exception('Задача %s #%s не выполнена', task.name, pk)
+        retry = function is not None and (
+            task.attempts < task.max_attempts)
+        error = traceback.format_exc()
+        if retry:
+            requeue(Task.objects.filter(pk=pk),
+                    run_at=function.retry_at(task.attempts),
+                    last_error=error)
+        else:
+            Task.objects.filter(pk=pk).update(
+                status=Task.FAILED, locked_by='', locked_at=None,
+                last_error=error)
+        return False
+    Task.objects.filter(pk=pk).delete()
+    return True
+
+
+def execute_in_pool(pk):
+    """execute() в процессе пула, который сам следит за соединениями."""
+    try:
+        return execute(pk)
+    finally:
+        close_old_connections()
+
+
+def requeue(tasks, **fields):
+    """Возвращает задачи в очередь.
+
+    Если такая же задача с ключом уже ждёт там, возвращаемая удаляется:
+    двух ждущих задач с одним ключом быть не может.
+    """
+    try:
+        with transaction.atomic():
+            return tasks.update(
+                status=Task.QUEUED, locked_by='', locked_at=None, **fields)
+    except IntegrityError:
+        tasks.delete()
+        return 0
+
+
+def requeue_stale():
+    """Возвращает в очередь задачи, воркер которых пропал."""
+    deadline = timezone.now() - timedelta(
+        seconds=settings.TASKS_LOCK_TIMEOUT)
+    stale = Task.objects.filter(status=Task.RUNNING, locked_at__lt=deadline)
+    return sum(
+        requeue(stale.filter(pk=pk))
+        for pk in stale.values_list('pk', flat=True)
+    )
+
+
+class Worker:
+    """Берёт задачи из базы и выполняет их в пуле процессов.
+
+    При processes=0 задачи выполняются в самом воркере, по одной.
+    """
+
+    def __init__(self, processes=1, poll=1.0):
+        self.processes = processes
+        self.poll = poll
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+
+    def run(self, once=False):
+        """Работает до остановки, а с once — пока есть готовые задачи."""
+        pool = None
+        if self.processes:
+            connections.close_all()
+            pool = ProcessPoolExecutor(
+                max_workers=self.processes,
+                mp_context=multiprocessing.get_context('spawn'),
+                # Процесс пула загружает Django до разбора задач.
+                initializer=django.setup,
+            )
+        running = set()
+        checked = 0
+        executed = 0
+        try:
+            while True:
+                if time.monotonic() - checked > STALE_CHECK_SECONDS:
+                    requeue_stale()
+                    checked = time.monotonic()
+                free = max(self.processes, 1) - len(running)
+                claimed = claim(self.name, free) if free else []
+                for pk in claimed:
+                    if pool is None:
+                        execute(pk)
+                    else:
+                        running.add(pool.submit(execute_in_pool, pk))
+                executed += len(claimed)
+                if running:
+                    _, running = wait(
+                        running, self.poll, return_when=FIRST_COMPLETED)
+                elif not claimed:
+                    if once:
+                        return executed
+                    close_old_connections()
+                    time.sleep(self.poll)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=True)
@@ -0,0 +1,66 @@
+"""Настройка CACHES из одной строки вида CACHE_URL.
+
+    redis://host:6379/0        — Redis, нужен пакет django-redis
+    memcached://host:11211     — memcached, нужен пакет pylibmc
+    sqlite:////var/tmp/yatube.sqlite3
+                               — файл SQLite, общий для процессов хоста
+    file:///var/tmp/yatube     — файлы на диске
+    db://yatube_cache          — таблица в основной базе
+                                 (manage.py createcachetable)
+    locmem://                  — память процесса
+
+Общими для нескольких воркеров годятся Redis, memcached и, на одном
+хосте, SQLite (core.sqlite_cache). В файловом и табличном кэше add() и
+incr() не атомарны, а при чистке удаляются и вечные ключи версий.
+Параметры запроса переходят в OPTIONS: ?max_entries=10000.
+"""
+from urllib.parse import parse_qsl, urlsplit
+
+BACKENDS = {
+    'redis': 'django_redis.cache.RedisCache',
+    'rediss': 'django_redis.cache.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyLibMCCache',
+    'sqlite': 'core.sqlite_cache.SQLiteCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+}
+
+
+def parse_cache_url(url, key_prefix='', max_connections=50, timeout=300):
+    parts = urlsplit(url)
+    if parts.scheme not in BACKENDS:
+        raise ValueError(f'Unsupported cache scheme: {parts.scheme!r}')
+    options = {
+        # pylibmc принимает параметры клиента в нижнем регистре.
+        name if parts.scheme == 'memcached' else name.upper():
+            int(value) if value.isdigit() else value
+        for name, value in parse_qsl(parts.query)
+    }
+    config = {
+        'BACKEND': BACKENDS[parts.scheme],
+        'KEY_PREFIX': key_prefix,
+        'TIMEOUT': timeout,
+    }
+    if parts.scheme in ('redis', 'rediss'):
+        config['LOCATION'] = url.split('?', 1)[0]
+        # Один пул соединений на процесс вместо подключения на запрос.
+        options.setdefault(
+            'CONNECTION_POOL_KWARGS', {'max_connections': max_connections})
+    elif parts.scheme == 'memcached':
+        config['LOCATION'] = parts.netloc.split(',')
+        # libmemcached держит соединения открытыми между запросами.
+        options.setdefault('binary', True)
+        options.setdefault(
+            'behaviors', {'tcp_nodelay': True, 'ketama': True})
+    elif parts.scheme == 'sqlite':
+        config['LOCATION'] = parts.path[1:]
+    elif parts.scheme == 'file':
+        config['LOCATION'] = parts.path
+    elif parts.scheme == 'db':
+        config['LOCATION'] = parts.netloc or parts.path.lstrip('/')
+    else:
+        config['LOCATION'] = parts.netloc
+    if options:
+        config['OPTIONS'] = options
+    return config
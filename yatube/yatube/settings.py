@@ -12,6 +12,9 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 
 import os
 
+from .caches import parse_cache_url
+from .databases import parse_database_url
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -40,6 +43,8 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
+    'tasks.apps.TasksConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -50,7 +55,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'posts.middleware.AnonymousPageCacheMiddleware',
+    'core.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -64,7 +72,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.templates.InstrumentedTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,6 +82,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.notifications.notifications',
             ],
         },
     },
@@ -85,13 +94,25 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Формат DATABASE_URL описан в yatube/databases.py
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    'default': parse_database_url(os.environ.get(
+        'DATABASE_URL',
+        f"sqlite:///{os.path.join(BASE_DIR, 'db.sqlite3')}",
+    )),
 }
 
+# Реплики для чтения, через запятую в формате DATABASE_URL
+DATABASE_REPLICAS = []
+for number, url in enumerate(
+        filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')),
+        start=1):
+    DATABASES[f'replica_{number}'] = parse_database_url(url)
+    DATABASE_REPLICAS.append(f'replica_{number}')
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Сколько секунд после записи пользователь читает с основной базы
+REPLICA_PIN_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -136,10 +157,104 @@ LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма отправляет воркер очереди задач пачками по EMAIL_BATCH_SIZE
+# через TASKS_EMAIL_BACKEND: SMTP, если задан EMAIL_HOST, иначе файлы
+EMAIL_BACKEND = 'tasks.mail.QueuedEmailBackend'
+EMAIL_HOST = os.environ.get('EMAIL_HOST', '')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS') == '1'
+EMAIL_TIMEOUT = 10
+TASKS_EMAIL_BACKEND = (
+    'django.core.mail.backends.smtp.EmailBackend' if EMAIL_HOST
+    else 'django.core.mail.backends.filebased.EmailBackend'
+)
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+EMAIL_BATCH_SIZE = 50
+EMAIL_MAX_ATTEMPTS = 5
+# Пауза перед повтором в секундах, удваивается с каждой попыткой
+EMAIL_RETRY_DELAY = 60
+
+# Процессы воркера очереди задач и через сколько секунд задача
+# пропавшего воркера возвращается в очередь
+TASKS_PROCESSES = 2
+TASKS_LOCK_TIMEOUT = 60 * 10
+
+# Формат CACHE_URL описан в yatube/caches.py. По умолчанию кэш лежит в
+# файле SQLite, общем для всех процессов хоста; нескольким хостам нужен
+# Redis или Memcached.
+CACHE_URL = os.environ.get(
+    'CACHE_URL',
+    f"sqlite:///{os.path.join(BASE_DIR, 'cache', 'cache.sqlite3')}"
+    f'?max_entries=100000',
+)
+CACHES = {
+    'default': parse_cache_url(
+        CACHE_URL,
+        key_prefix=os.environ.get('CACHE_KEY_PREFIX', 'yatube'),
+        max_connections=int(os.environ.get('CACHE_MAX_CONNECTIONS', 50)),
+    ),
+}
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Кэш страниц для анонимов
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TIMEOUT = FEED_CACHE_TIMEOUT
+
+# Новые посты раскладываются по лентам подписок задачей очереди
+FEED_ASYNC = True
+
+# Уведомления подписчикам рассылаются задачей очереди
+NOTIFICATIONS_ASYNC = True
+NOTIFICATIONS_CACHE_TIMEOUT = FEED_CACHE_TIMEOUT
+
+# Живые обновления лент. Каждая открытая вкладка держит поток WSGI и
+# соединение с базой до LIVE_STREAM_SECONDS, поэтому по умолчанию они
+# выключены: включайте, только если потоков сервера хватит на всех.
+# LocalBroker хватает одного процесса сервера, CacheBroker видит и посты
+# из других процессов через версии в кэше.
+LIVE_UPDATES_ENABLED = os.environ.get('LIVE_UPDATES_ENABLED') == '1'
+LIVE_BROKER = 'posts.live.CacheBroker'
+LIVE_POLL_SECONDS = 1
+LIVE_KEEPALIVE_SECONDS = 15
+LIVE_STREAM_SECONDS = 300
+LIVE_LONG_POLL_SECONDS = 25
+LIVE_RETRY_MS = 5000
+
+# Метрики запросов по вьюхам отдаются по адресу /metrics
+METRICS_ENABLED = True
+# Prometheus предъявляет этот токен в заголовке
+# «Authorization: Bearer <токен>». Без токена метрики отдаются только
+# адресам из METRICS_ALLOWED_IPS (через запятую). По умолчанию список
+# пуст: за прокси на том же хосте REMOTE_ADDR у всех 127.0.0.1.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_IPS = list(
+    filter(None, os.environ.get('METRICS_ALLOWED_IPS', '').split(',')))
+# Запросы дольше этого пишутся в лог yatube.slow_requests
+SLOW_REQUEST_SECONDS = float(os.environ.get('SLOW_REQUEST_SECONDS', 1))
+
+# None выбирает бэкенд поиска по типу базы данных
+SEARCH_BACKEND = None
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+THUMBNAIL_BACKEND = 'posts.thumbnails.DeferredThumbnailBackend'
+THUMBNAIL_ASYNC = True
+THUMBNAIL_PLACEHOLDER = 'img/placeholder.svg'
+IMAGE_VARIANT_RATIO = (960, 339)
+IMAGE_VARIANT_WIDTHS = [480, 960, 1440]
+IMAGE_VARIANT_FORMATS = ['WEBP', 'JPEG']
+IMAGE_VARIANT_SIZES = '(max-width: 960px) 100vw, 960px'
+THUMBNAIL_PRESETS = [
+    (
+        f'{width}x{width * IMAGE_VARIANT_RATIO[1] // IMAGE_VARIANT_RATIO[0]}',
+        {'crop': 'center', 'upscale': True, 'format': image_format},
+    )
+    for image_format in IMAGE_VARIANT_FORMATS
+    for width in IMAGE_VARIANT_WIDTHS
+]
@@ -0,0 +1,34 @@
+"""Настройки тестов.
+
+Это боевые настройки с отличиями, без которых тесты невозможны.
+Остальное тесты меняют сами через override_settings.
+"""
+import os
+import tempfile
+
+from .caches import parse_cache_url
+from .databases import ENGINES, parse_database_url
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+# SQLite в памяти при записи из нескольких потоков сразу отвечает
+# «table is locked», а файл в режиме WAL ждёт блокировку, как в работе.
+if DATABASES['default']['ENGINE'] == ENGINES['sqlite']:
+    DATABASES['default']['TEST'] = {
+        'NAME': os.path.join(tempfile.gettempdir(), 'yatube_test.sqlite3'),
+    }
+
+# Отдельная база без репликации, на ней тесты проверяют маршрутизацию
+DATABASES['replica'] = parse_database_url('sqlite://:memory:')
+
+# Кэш в памяти процесса: тесты не делят его с запущенным сайтом.
+CACHE_URL = 'locmem://'
+CACHES = {'default': parse_cache_url(CACHE_URL, key_prefix='yatube')}
+
+# Тесты смотрят ленту подписок сразу после публикации. Раскладку
+# очередью проверяют тесты с override_settings(FEED_ASYNC=True).
+FEED_ASYNC = False
+
+# Тесты читают response.context, а у ответа из кэша страниц его нет.
+# Сам кэш проверяют тесты с override_settings(PAGE_CACHE_ENABLED=True).
+PAGE_CACHE_ENABLED = False